@@ -0,0 +1,289 @@
+import os
+import random
+import sys
+import time
+
+import openai
+from psycopg2.extras import execute_values
+
+import stub_openai
+from db import BancoDados
+from execucao import Executor
+from formato_embedding import EMBEDDING_FORMATO, TIPOS_COLUNA, serializar_embedding
+from indice_embeddings import IndiceEmbeddings
+from busca_pgvector import BuscaPgvector
+from metricas import metricas
+from motor import MotorBusca
+from migrar_esquema import criar_indice_textual, migrar_esquema
+from sincronizacao import hash_paragrafo
+
+BENCHMARK_DSN = os.environ.get("BENCHMARK_DSN", "")
+BENCHMARK_DIMENSAO = int(os.environ.get("BENCHMARK_DIMENSAO", "256"))
+BENCHMARK_CONSULTAS = int(os.environ.get("BENCHMARK_CONSULTAS", "200"))
+BENCHMARK_CONCORRENCIA = int(os.environ.get("BENCHMARK_CONCORRENCIA", "4"))
+BENCHMARK_PARAGRAFOS_POR_DOC = int(os.environ.get("BENCHMARK_PARAGRAFOS_POR_DOC", "50"))
+BENCHMARK_LOTE = int(os.environ.get("BENCHMARK_LOTE", "5000"))
+BENCHMARK_BACKEND = os.environ.get("BUSCA_BACKEND", "local")
+NOME_BENCHMARK = "Benchmark"
+USA_PGVECTOR = "pgvector" in (EMBEDDING_FORMATO, BENCHMARK_BACKEND)
+COLUNA_EMBEDDING = (
+    f"vector({BENCHMARK_DIMENSAO})" if EMBEDDING_FORMATO == "pgvector" else TIPOS_COLUNA[EMBEDDING_FORMATO]
+)
+
+SILABAS = ["ca", "ra", "to", "me", "li", "sa", "de", "pro", "ban", "con", "ta", "ti", "vo", "nu", "fa", "po", "gu", "lha"]
+VOCABULARIO = sorted({
+    "".join(random.Random(i).choices(SILABAS, k=2 + i % 3)) for i in range(6000)
+}, key=lambda palavra: (len(palavra), palavra))
+PESOS = [1 / (posicao + 1) for posicao in range(len(VOCABULARIO))]
+
+SQL_ESQUEMA_BENCHMARK = f"""
+    {"CREATE EXTENSION IF NOT EXISTS vector;" if USA_PGVECTOR else ""}
+    CREATE SCHEMA IF NOT EXISTS bloqueio_v2;
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.categoria (
+        categoria_id SERIAL PRIMARY KEY, nome TEXT NOT NULL, descricao TEXT
+    );
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.subcategoria (
+        subcategoria_id SERIAL PRIMARY KEY, categoria_id INTEGER NOT NULL, nome TEXT NOT NULL, descricao TEXT
+    );
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.documento (
+        documento_id SERIAL PRIMARY KEY, titulo TEXT, tipo TEXT, url_arquivo TEXT,
+        data_inclusao DATE, subcategoria_id INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.documento_embedding (
+        documento_id INTEGER, texto_concatenado TEXT, embedding {COLUNA_EMBEDDING}
+    );
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.documento_paragrafo_embedding (
+        documento_id INTEGER, paragrafo TEXT, embedding {COLUNA_EMBEDDING}
+    );
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.documento_palavra_chave (
+        documento_id INTEGER, palavra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS documento_subcategoria_idx ON bloqueio_v2.documento (subcategoria_id);
+    CREATE INDEX IF NOT EXISTS documento_paragrafo_embedding_documento_idx
+        ON bloqueio_v2.documento_paragrafo_embedding (documento_id);
+"""
+
+
+def texto_sintetico(i):
+    rng = random.Random(i)
+    return " ".join(rng.choices(VOCABULARIO, weights=PESOS, k=rng.randint(20, 60)))
+
+
+def pergunta_sintetica(i, rng):
+    palavras = [p for p in texto_sintetico(i).split() if rng.random() >= 0.3]
+    return " ".join(palavras[:12])
+
+
+def obter_subcategoria(cursor):
+    cursor.execute("SELECT categoria_id FROM bloqueio_v2.categoria WHERE nome = %s", (NOME_BENCHMARK,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            "INSERT INTO bloqueio_v2.categoria (nome, descricao) VALUES (%s, %s) RETURNING categoria_id",
+            (NOME_BENCHMARK, "Dados sintéticos do benchmark"),
+        )
+        row = cursor.fetchone()
+    categoria_id = row[0]
+    cursor.execute(
+        "SELECT subcategoria_id FROM bloqueio_v2.subcategoria WHERE categoria_id = %s AND nome = %s",
+        (categoria_id, NOME_BENCHMARK),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            """
+            INSERT INTO bloqueio_v2.subcategoria (categoria_id, nome, descricao) VALUES (%s, %s, %s)
+            RETURNING subcategoria_id
+            """,
+            (categoria_id, NOME_BENCHMARK, "Dados sintéticos do benchmark"),
+        )
+        row = cursor.fetchone()
+    return categoria_id, row[0]
+
+
+def contar_paragrafos(cursor, subcategoria_id):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM bloqueio_v2.documento_paragrafo_embedding e
+        JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+        WHERE d.subcategoria_id = %s
+        """,
+        (subcategoria_id,),
+    )
+    return cursor.fetchone()[0]
+
+
+def semear_lote(cursor, subcategoria_id, inicio, fim):
+    por_doc = BENCHMARK_PARAGRAFOS_POR_DOC
+    primeiros = list(range(inicio, fim, por_doc))
+    documento_ids = [
+        row[0] for row in execute_values(
+            cursor,
+            """
+            INSERT INTO bloqueio_v2.documento (titulo, tipo, url_arquivo, data_inclusao, subcategoria_id)
+            VALUES %s RETURNING documento_id
+            """,
+            [
+                (f"Documento sintético {i // por_doc}", "Benchmark", f"https://exemplo.invalid/{i // por_doc}.docx",
+                 time.strftime("%Y-%m-%d"), subcategoria_id)
+                for i in primeiros
+            ],
+            fetch=True,
+        )
+    ]
+    linhas = []
+    for documento_id, primeiro in zip(documento_ids, primeiros):
+        for i in range(primeiro, min(primeiro + por_doc, fim)):
+            texto = texto_sintetico(i)
+            linhas.append((
+                documento_id, texto, serializar_embedding(stub_openai.embedding_falso(texto)),
+                hash_paragrafo(texto), i - primeiro,
+            ))
+    execute_values(
+        cursor,
+        """
+        INSERT INTO bloqueio_v2.documento_paragrafo_embedding
+            (documento_id, paragrafo, embedding, hash_conteudo, ordem)
+        VALUES %s
+        """,
+        linhas,
+        page_size=1000,
+    )
+
+
+def semear(banco, subcategoria_id, total):
+    existentes = banco.com_cursor(contar_paragrafos, subcategoria_id)
+    inicio = time.perf_counter()
+    atual = existentes
+    while atual < total:
+        fim = min(total, atual + BENCHMARK_LOTE)
+        fim = atual + -(-(fim - atual) // BENCHMARK_PARAGRAFOS_POR_DOC) * BENCHMARK_PARAGRAFOS_POR_DOC
+        banco.com_transacao(semear_lote, subcategoria_id, atual, fim)
+        atual = fim
+        print(f"  semeados {atual}/{total} parágrafos", end="\r")
+    if atual > existentes:
+        banco.com_transacao(lambda cursor: cursor.execute("ANALYZE bloqueio_v2.documento_paragrafo_embedding"))
+        print(f"  {atual - existentes} parágrafos semeados em {time.perf_counter() - inicio:.1f}s")
+    return atual
+
+
+def aguardar(executor, quantidade):
+    concluidas = erros = 0
+    while concluidas < quantidade:
+        _, tipo, dados = executor.fila.get()
+        if tipo in ("fim", "erro", "cancelada"):
+            concluidas += 1
+            if tipo == "erro":
+                erros += 1
+                print(f"  erro: {dados}")
+    return erros
+
+
+def executar_consultas(executor, motor, categoria_id, subcategoria_id, total_paragrafos):
+    rng = random.Random(total_paragrafos)
+    perguntas = [pergunta_sintetica(rng.randrange(total_paragrafos), rng) for _ in range(BENCHMARK_CONSULTAS)]
+
+    inicio = time.perf_counter()
+    executor.submeter(motor.buscar, perguntas[0], categoria_id, subcategoria_id)
+    aguardar(executor, 1)
+    aquecimento = time.perf_counter() - inicio
+    metricas.limpar()
+
+    inicio = time.perf_counter()
+    for pergunta in perguntas:
+        executor.submeter(motor.buscar, pergunta, categoria_id, subcategoria_id)
+    erros = aguardar(executor, len(perguntas))
+    return aquecimento, time.perf_counter() - inicio, erros
+
+
+def relatorio(total, aquecimento, duracao, erros):
+    p50, p95, p99 = metricas.percentis("tarefa", "buscar", 50, 95, 99)
+    print(
+        f"\nN={total}: {BENCHMARK_CONSULTAS / duracao:.1f} consultas/s com {BENCHMARK_CONCORRENCIA} em paralelo, "
+        f"{erros} erro(s), primeira consulta (carga do índice) {aquecimento * 1000:.0f}ms"
+    )
+    print(f"  total: p50={p50 * 1000:.1f}ms p95={p95 * 1000:.1f}ms p99={p99 * 1000:.1f}ms")
+    for (familia, nome), dados in sorted(metricas.resumo().items()):
+        if familia in ("etapa", "api", "consulta"):
+            print(
+                f"  {familia:>8} {nome:<22} n={dados['total']:<6} p50={dados['p50_ms']:.2f}ms "
+                f"p95={dados['p95_ms']:.2f}ms p99={dados['p99_ms']:.2f}ms"
+            )
+
+
+def medir_pendencias():
+    from salvar_pendencia_mistral import resumir_perguntas
+
+    rng = random.Random(0)
+    perguntas = [pergunta_sintetica(rng.randrange(10 ** 6), rng) for _ in range(10)]
+    with metricas.medir("api", "ollama_resumo_lote"):
+        resumir_perguntas(perguntas)
+    p50, = metricas.percentis("api", "ollama_resumo_lote", 50)
+    print(f"\nResumo de pendências (lote de {len(perguntas)}, Ollama simulado): {p50 * 1000:.1f}ms")
+
+
+def limpar(banco, subcategoria_id):
+    def remover(cursor):
+        cursor.execute(
+            """
+            DELETE FROM bloqueio_v2.documento_paragrafo_embedding e
+            USING bloqueio_v2.documento d
+            WHERE d.documento_id = e.documento_id AND d.subcategoria_id = %s
+            """,
+            (subcategoria_id,),
+        )
+        cursor.execute("DELETE FROM bloqueio_v2.documento WHERE subcategoria_id = %s", (subcategoria_id,))
+
+    banco.com_transacao(remover)
+    print("Dados sintéticos removidos.")
+
+
+def executar(tamanhos, manter=False):
+    stub_openai.STUB_DIMENSAO = BENCHMARK_DIMENSAO
+    stub_openai.iniciar_stub(stub_openai.STUB_PORTA)
+    openai.api_base = f"http://127.0.0.1:{stub_openai.STUB_PORTA}/v1"
+    openai.api_key = "stub"
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{stub_openai.STUB_PORTA}"
+
+    banco = BancoDados(dsn=BENCHMARK_DSN)
+    executor = Executor(workers=BENCHMARK_CONCORRENCIA)
+    indice = BuscaPgvector() if BENCHMARK_BACKEND == "pgvector" else IndiceEmbeddings(intervalo_verificacao=0)
+    motor = MotorBusca(banco, indice, limiar=-1, limiar_contexto=-1, usar_cache=False)
+    subcategoria_id = None
+    try:
+        def preparar(cursor):
+            cursor.execute(SQL_ESQUEMA_BENCHMARK)
+            migrar_esquema(cursor)
+            return obter_subcategoria(cursor)
+
+        categoria_id, subcategoria_id = banco.com_transacao(preparar)
+        with banco.conexao() as conn:
+            criar_indice_textual(conn)
+        print(f"Benchmark na subcategoria {subcategoria_id} ({BENCHMARK_BACKEND}, dimensão {BENCHMARK_DIMENSAO})")
+        for tamanho in sorted(tamanhos):
+            total = semear(banco, subcategoria_id, tamanho)
+            metricas.limpar()
+            aquecimento, duracao, erros = executar_consultas(
+                executor, motor, categoria_id, subcategoria_id, total
+            )
+            relatorio(total, aquecimento, duracao, erros)
+        medir_pendencias()
+    finally:
+        if subcategoria_id is not None and not manter:
+            limpar(banco, subcategoria_id)
+        executor.encerrar()
+        banco.fechar()
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not argumentos:
+        print("Uso: python benchmark_busca.py <paragrafos> [<paragrafos> ...] [--manter]")
+        print("  ex.: python benchmark_busca.py 1000 10000 100000 1000000")
+        print("  Usa o PostgreSQL de BENCHMARK_DSN e os stubs locais de OpenAI/Ollama; migra o esquema e grava")
+        print("  numa subcategoria própria, por isso aponte BENCHMARK_DSN para um banco descartável.")
+        sys.exit(1)
+    if not BENCHMARK_DSN:
+        print("BENCHMARK_DSN não definido: informe o DSN de um banco descartável (ex.: dbname=bot_benchmark).")
+        sys.exit(1)
+    executar([int(a) for a in argumentos], manter="--manter" in sys.argv)
@@ -0,0 +1,119 @@
+import csv
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import openai
+from docx import Document
+
+from chunker import ChunkerParagrafo, ChunkerTokens
+from comparar_busca import percentil
+from indice_embeddings import normalizar_linhas, top_k
+from ingestao_embeddings import estimar_tokens, gerar_embeddings
+from palavras_chave import normalizar_texto
+from stub_openai import STUB_PORTA, iniciar_stub
+
+K = int(os.environ.get("BENCHMARK_K", "3"))
+CONSULTAS = int(os.environ.get("BENCHMARK_CONSULTAS", "200"))
+DESCARTE = float(os.environ.get("BENCHMARK_DESCARTE", "0.2"))
+PALAVRAS_TRECHO = 6
+
+CONFIGURACOES = [
+    ("paragrafo", ChunkerParagrafo()),
+    ("tokens-128/16", ChunkerTokens(max_tokens=128, sobreposicao=16)),
+    ("tokens-256/0", ChunkerTokens(max_tokens=256, sobreposicao=0)),
+    ("tokens-256/32", ChunkerTokens(max_tokens=256, sobreposicao=32)),
+    ("tokens-512/64", ChunkerTokens(max_tokens=512, sobreposicao=64)),
+    ("tokens-256/32 sem títulos", ChunkerTokens(max_tokens=256, sobreposicao=32, titulos=False)),
+]
+
+
+def compacto(texto):
+    return " ".join(normalizar_texto(texto).split())
+
+
+def consultas_sinteticas(documentos, quantidade, rng):
+    candidatos = [
+        p.text.split() for doc in documentos for p in doc.paragraphs if len(p.text.split()) >= PALAVRAS_TRECHO * 2
+    ]
+    consultas = []
+    for palavras in rng.sample(candidatos, min(quantidade, len(candidatos))):
+        inicio = (len(palavras) - PALAVRAS_TRECHO) // 2
+        trecho = " ".join(palavras[inicio:inicio + PALAVRAS_TRECHO])
+        pergunta = " ".join(p for p in palavras if rng.random() >= DESCARTE)
+        consultas.append((pergunta, trecho))
+    return consultas
+
+
+def ler_consultas(caminho):
+    with open(caminho, encoding="utf-8", newline="") as f:
+        return [(linha[0], linha[1]) for linha in csv.reader(f, delimiter=";") if len(linha) >= 2]
+
+
+def avaliar(nome, chunker, documentos, consultas, vetores_consultas, usar_cache=True):
+    chunks = [chunk for doc in documentos for chunk in chunker.dividir(doc)]
+    if not chunks:
+        print(f"{nome:>26}: nenhum trecho gerado")
+        return
+    matriz = normalizar_linhas(np.asarray(gerar_embeddings(chunks, usar_cache=usar_cache), dtype=np.float32))
+    compactos = [compacto(chunk) for chunk in chunks]
+    acertos_1 = acertos_k = 0
+    melhores, tempos = [], []
+    for (_, trecho), vetor in zip(consultas, vetores_consultas):
+        inicio = time.perf_counter()
+        scores = matriz @ vetor
+        candidatos = top_k(scores, K)
+        tempos.append(time.perf_counter() - inicio)
+        alvo = compacto(trecho)
+        encontrados = [alvo in compactos[i] for i in candidatos]
+        acertos_1 += bool(encontrados and encontrados[0])
+        acertos_k += any(encontrados)
+        melhores.append(float(scores[candidatos[0]]))
+    tokens = [estimar_tokens(chunk) for chunk in chunks]
+    print(
+        f"{nome:>26}: hit@1={acertos_1 / len(consultas):.3f} hit@{K}={acertos_k / len(consultas):.3f} "
+        f"trechos={len(chunks)} tokens={sum(tokens)} maior={max(tokens)} índice={matriz.nbytes / 1e6:.2f}MB "
+        f"score médio={np.mean(melhores):.3f} p50={percentil(tempos, 50):.3f}ms p95={percentil(tempos, 95):.3f}ms"
+    )
+    limite = getattr(chunker, "max_tokens", None)
+    excedentes = [t for t in tokens if limite and t > limite]
+    if excedentes:
+        print(f"{'':>26}  ATENÇÃO: {len(excedentes)} trecho(s) acima de {limite} tokens (maior: {max(excedentes)})")
+
+
+def executar(diretorio, arquivo_consultas=None, usar_cache=True):
+    caminhos = sorted(p for p in Path(diretorio).rglob("*.docx") if not p.name.startswith("~$"))
+    documentos = [Document(str(caminho)) for caminho in caminhos]
+    rng = random.Random(42)
+    consultas = ler_consultas(arquivo_consultas) if arquivo_consultas else consultas_sinteticas(documentos, CONSULTAS, rng)
+    if not consultas:
+        print("Nenhuma consulta disponível para o benchmark.")
+        return
+    vetores = gerar_embeddings([pergunta for pergunta, _ in consultas], usar_cache=usar_cache)
+    vetores_consultas = normalizar_linhas(np.asarray(vetores, dtype=np.float32))
+    print(f"Documentos: {len(documentos)} | consultas: {len(consultas)} | k={K}")
+    for nome, chunker in CONFIGURACOES:
+        avaliar(nome, chunker, documentos, consultas, vetores_consultas, usar_cache)
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if a != "--stub"]
+    if not argumentos:
+        print("Uso: python benchmark_chunker.py <diretorio_docx> [consultas.csv] [--stub]")
+        print("  consultas.csv: 'pergunta;trecho esperado' por linha (sem ele, as consultas são sintéticas)")
+        sys.exit(1)
+
+    if "--stub" in sys.argv:
+        iniciar_stub(STUB_PORTA)
+        openai.api_base = f"http://127.0.0.1:{STUB_PORTA}/v1"
+        openai.api_key = openai.api_key or "stub"
+    elif not os.environ.get("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY não definida (use --stub para embeddings locais). Abortando.")
+        sys.exit(1)
+    else:
+        openai.api_key = os.environ["OPENAI_API_KEY"]
+
+    executar(argumentos[0], argumentos[1] if len(argumentos) > 1 else None, usar_cache="--stub" not in sys.argv)
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+from contextlib import closing
+
+import numpy as np
+
+from busca_pgvector import BuscaPgvector
+from comparar_busca import CONSULTAS, K, RUIDO, percentil
+from db import conectar
+from indice_embeddings import IndiceEmbeddings
+from ingestao_embeddings import gerar_embeddings
+
+PREFILTRO_VALORES = [int(v) for v in os.environ.get("PREFILTRO_VALORES", "1,2,5,10,20,50").split(",")]
+
+
+def ler_perguntas(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [linha.strip() for linha in arquivo if linha.strip()]
+
+
+def gerar_consultas(indice, perguntas=None):
+    if perguntas:
+        return [np.asarray(v, dtype=np.float32) for v in gerar_embeddings(perguntas)]
+    rng = np.random.default_rng(42)
+    linhas = rng.choice(len(indice), size=min(CONSULTAS, len(indice)), replace=False)
+    return [
+        indice.matriz[i] + rng.normal(0, RUIDO, indice.matriz.shape[1]).astype(np.float32)
+        for i in linhas
+    ]
+
+
+def medir(buscar, consultas):
+    resultados, tempos = [], []
+    for vetor in consultas:
+        inicio = time.perf_counter()
+        achados = buscar(vetor)
+        tempos.append(time.perf_counter() - inicio)
+        resultados.append([(r["documento_id"], r["paragrafo"]) for r in achados])
+    return resultados, tempos
+
+
+def recall(esperados, obtidos):
+    valores = [len(set(e) & set(o)) / len(e) for e, o in zip(esperados, obtidos) if e]
+    return float(np.mean(valores)) if valores else 0.0
+
+
+def acerto_top1(esperados, obtidos):
+    valores = [bool(o) and o[0] == e[0] for e, o in zip(esperados, obtidos) if e]
+    return float(np.mean(valores)) if valores else 0.0
+
+
+def fracao_pontuada(indice, consultas, prefiltro):
+    if len(indice.faixas) <= prefiltro:
+        return 1.0
+    fracoes = []
+    for vetor in consultas:
+        consulta = vetor / (np.linalg.norm(vetor) or 1.0)
+        fracoes.append(len(indice.linhas_prefiltradas(consulta, prefiltro)) / len(indice))
+    return float(np.mean(fracoes))
+
+
+def imprimir(nome, esperados, obtidos, tempos, base, fracao=None):
+    p50 = percentil(tempos, 50)
+    linha = (
+        f"{nome:>14}: recall@{K}={recall(esperados, obtidos):.4f} top1={acerto_top1(esperados, obtidos):.4f} "
+        f"p50={p50:.2f}ms p95={percentil(tempos, 95):.2f}ms speed-up={base / p50 if p50 else 0:.1f}x"
+    )
+    if fracao is not None:
+        linha += f" parágrafos pontuados={fracao * 100:.1f}%"
+    print(linha)
+
+
+def comparar(cursor, subcategoria_id, perguntas=None, pgvector=False):
+    indice = IndiceEmbeddings(intervalo_verificacao=float("inf")).obter(cursor, subcategoria_id)
+    if len(indice) == 0:
+        print("Subcategoria sem parágrafos.")
+        return
+    if len(indice.matriz_documentos) == 0:
+        print("Nenhum documento da subcategoria tem embedding em documento_embedding.")
+        return
+
+    consultas = gerar_consultas(indice, perguntas)
+    print(
+        f"Parágrafos: {len(indice)} | documentos com embedding: {len(indice.faixas)} "
+        f"(sem embedding, sempre pontuados: {len(indice.sem_vetor)} parágrafos) | "
+        f"consultas: {len(consultas)} | k={K}"
+    )
+
+    esperados, tempos = medir(lambda v: indice.buscar(v, K, prefiltro=0), consultas)
+    base = percentil(tempos, 50)
+    imprimir("exata", esperados, esperados, tempos, base, 1.0)
+    for prefiltro in PREFILTRO_VALORES:
+        obtidos, tempos = medir(lambda v: indice.buscar(v, K, prefiltro=prefiltro), consultas)
+        imprimir(f"top-{prefiltro} docs", esperados, obtidos, tempos, base, fracao_pontuada(indice, consultas, prefiltro))
+
+    if pgvector:
+        busca = BuscaPgvector()
+        print("\npgvector (inclui ida e volta ao banco):")
+        _, tempos = medir(lambda v: busca.buscar(cursor, subcategoria_id, v, k=K, prefiltro=0), consultas)
+        base = percentil(tempos, 50)
+        for prefiltro in [0] + PREFILTRO_VALORES:
+            obtidos, tempos = medir(
+                lambda v: busca.buscar(cursor, subcategoria_id, v, k=K, prefiltro=prefiltro), consultas
+            )
+            imprimir(f"top-{prefiltro} docs" if prefiltro else "sem prefiltro", esperados, obtidos, tempos, base)
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not argumentos:
+        print("Uso: python benchmark_prefiltro.py <subcategoria_id> [perguntas.txt] [--pgvector]")
+        sys.exit(1)
+
+    conn = None
+    try:
+        perguntas = ler_perguntas(argumentos[1]) if len(argumentos) > 1 else None
+        conn = conectar()
+        with closing(conn.cursor()) as cursor:
+            comparar(cursor, int(argumentos[0]), perguntas, "--pgvector" in sys.argv)
+    except Exception as e:
+        print(f"Erro no benchmark: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
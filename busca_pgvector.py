@@ -0,0 +1,143 @@
+import os
+import re
+import threading
+
+from db import executar, executar_preparada
+from formato_embedding import serializar_embedding
+from indice_embeddings import PREFILTRO_DOCUMENTOS, SQL_ASSINATURA
+from recuperacao import IndiceLexico
+
+PGVECTOR_EF_SEARCH = os.environ.get("PGVECTOR_EF_SEARCH", "")
+PGVECTOR_PROBES = os.environ.get("PGVECTOR_PROBES", "")
+PGVECTOR_EF_FATOR = int(os.environ.get("PGVECTOR_EF_FATOR", "4"))
+EF_SEARCH_MAXIMO = 1000
+
+SQL_BUSCA = """
+    SELECT d.documento_id, d.titulo, d.url_arquivo, e.paragrafo,
+           1 - (e.embedding <=> %(vetor)s::vector) AS score
+    FROM bloqueio_v2.documento_paragrafo_embedding e
+    JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+    WHERE d.subcategoria_id = %(subcategoria_id)s
+    ORDER BY e.embedding <=> %(vetor)s::vector
+    LIMIT %(k)s
+"""
+
+SQL_BUSCA_PREFILTRADA = """
+    WITH documentos AS (
+        (
+            SELECT de.documento_id
+            FROM bloqueio_v2.documento_embedding de
+            JOIN bloqueio_v2.documento d ON d.documento_id = de.documento_id
+            WHERE d.subcategoria_id = %(subcategoria_id)s
+            ORDER BY de.embedding <=> %(vetor)s::vector
+            LIMIT %(prefiltro)s
+        )
+        UNION
+        SELECT d.documento_id
+        FROM bloqueio_v2.documento d
+        WHERE d.subcategoria_id = %(subcategoria_id)s
+          AND NOT EXISTS (
+              SELECT 1 FROM bloqueio_v2.documento_embedding de WHERE de.documento_id = d.documento_id
+          )
+    )
+    SELECT d.documento_id, d.titulo, d.url_arquivo, e.paragrafo,
+           1 - (e.embedding <=> %(vetor)s::vector) AS score
+    FROM bloqueio_v2.documento_paragrafo_embedding e
+    JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+    WHERE e.documento_id IN (SELECT documento_id FROM documentos)
+    ORDER BY e.embedding <=> %(vetor)s::vector
+    LIMIT %(k)s
+"""
+
+SQL_BUSCA_EXATA = """
+    SELECT d.documento_id, d.titulo, d.url_arquivo, e.paragrafo,
+           1 - (e.embedding <=> %(vetor)s::vector) AS score
+    FROM bloqueio_v2.documento_paragrafo_embedding e
+    JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+    WHERE d.subcategoria_id = %(subcategoria_id)s
+    ORDER BY score DESC
+    LIMIT %(k)s
+"""
+
+SQL_TEXTOS = """
+    SELECT d.documento_id, d.titulo, d.url_arquivo, e.paragrafo
+    FROM bloqueio_v2.documento_paragrafo_embedding e
+    JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+    WHERE d.subcategoria_id = %s
+    ORDER BY d.documento_id, e.ordem NULLS LAST
+"""
+
+
+class BuscaPgvector:
+    def __init__(self, ef_search=PGVECTOR_EF_SEARCH, probes=PGVECTOR_PROBES):
+        self.ef_search = int(ef_search) if ef_search else None
+        self.probes = int(probes) if probes else None
+        self._iterativa = None
+        self._lexicos = {}
+        self._lock = threading.Lock()
+
+    def _busca_iterativa(self, cursor):
+        if self._iterativa is None:
+            cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            row = cursor.fetchone()
+            versao = tuple(int(n) for n in re.findall(r"\d+", row[0])[:2]) if row else ()
+            self._iterativa = versao >= (0, 8)
+        return self._iterativa
+
+    def _configurar(self, cursor, k, prefiltro):
+        if self._busca_iterativa(cursor):
+            cursor.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+            cursor.execute("SET LOCAL ivfflat.iterative_scan = relaxed_order")
+        ef_search = max(self.ef_search or 0, PGVECTOR_EF_FATOR * max(k, prefiltro or 0))
+        cursor.execute("SET LOCAL hnsw.ef_search = %s", (min(ef_search, EF_SEARCH_MAXIMO),))
+        if self.probes:
+            cursor.execute("SET LOCAL ivfflat.probes = %s", (self.probes,))
+
+    def buscar(self, cursor, subcategoria_id, vetor, k=1, prefiltro=PREFILTRO_DOCUMENTOS):
+        self._configurar(cursor, k, prefiltro)
+        params = {
+            "vetor": serializar_embedding(vetor, "pgvector"),
+            "subcategoria_id": subcategoria_id,
+            "k": k,
+            "prefiltro": prefiltro,
+        }
+        executar(
+            cursor,
+            "busca_pgvector_prefiltrada" if prefiltro else "busca_pgvector",
+            SQL_BUSCA_PREFILTRADA if prefiltro else SQL_BUSCA,
+            params,
+        )
+        linhas = cursor.fetchall()
+        if len(linhas) < k:
+            executar(cursor, "busca_pgvector_exata", SQL_BUSCA_EXATA, params)
+            linhas = cursor.fetchall()
+        return sorted(
+            (
+                {
+                    "documento_id": documento_id,
+                    "titulo": titulo,
+                    "url": url,
+                    "paragrafo": paragrafo,
+                    "score": float(score),
+                }
+                for documento_id, titulo, url, paragrafo, score in linhas
+            ),
+            key=lambda r: -r["score"],
+        )
+
+    def lexico(self, cursor, subcategoria_id):
+        versao = self.versao(cursor, subcategoria_id)
+        with self._lock:
+            atual = self._lexicos.get(subcategoria_id)
+            if atual and atual[0] == versao:
+                return atual[1]
+        executar_preparada(cursor, "lexico_paragrafos", SQL_TEXTOS, (subcategoria_id,))
+        linhas = cursor.fetchall()
+        lexico = IndiceLexico(*(zip(*linhas) if linhas else ([], [], [], [])))
+        with self._lock:
+            self._lexicos[subcategoria_id] = (versao, lexico)
+        return lexico
+
+    def versao(self, cursor, subcategoria_id):
+        executar_preparada(cursor, "indice_assinatura", SQL_ASSINATURA, (subcategoria_id,))
+        return str(tuple(cursor.fetchone()))
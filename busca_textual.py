@@ -0,0 +1,47 @@
+import os
+
+from db import executar_preparada
+
+BUSCA_TEXTUAL_CONFIGURACAO = os.environ.get("BUSCA_TEXTUAL_CONFIGURACAO", "portuguese")
+
+SQL_BUSCA_TEXTUAL = f"""
+    WITH consulta AS (
+        SELECT
+            to_tsquery('{BUSCA_TEXTUAL_CONFIGURACAO}',
+                       replace(plainto_tsquery('{BUSCA_TEXTUAL_CONFIGURACAO}', %s)::text, '&', '|')) AS q,
+            tsvector_to_array(to_tsvector('{BUSCA_TEXTUAL_CONFIGURACAO}', %s)) AS termos
+    )
+    SELECT d.documento_id, d.titulo, d.url_arquivo, e.paragrafo,
+           ts_rank_cd(to_tsvector('{BUSCA_TEXTUAL_CONFIGURACAO}', e.paragrafo), c.q) AS rank,
+           (SELECT count(*) FROM unnest(tsvector_to_array(to_tsvector('{BUSCA_TEXTUAL_CONFIGURACAO}', e.paragrafo))) l
+            WHERE l = ANY(c.termos))::float / greatest(cardinality(c.termos), 1) AS cobertura,
+           cardinality(c.termos) AS termos
+    FROM consulta c, bloqueio_v2.documento_paragrafo_embedding e
+    JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+    WHERE d.subcategoria_id = %s
+      AND to_tsvector('{BUSCA_TEXTUAL_CONFIGURACAO}', e.paragrafo) @@ c.q
+    ORDER BY rank DESC, cobertura DESC
+    LIMIT %s
+"""
+
+
+class BuscaTextual:
+    def buscar(self, cursor, subcategoria_id, pergunta, k=20):
+        executar_preparada(
+            cursor,
+            "busca_textual",
+            SQL_BUSCA_TEXTUAL,
+            (pergunta, pergunta, subcategoria_id, k),
+        )
+        return [
+            {
+                "documento_id": documento_id,
+                "titulo": titulo,
+                "url": url,
+                "paragrafo": paragrafo,
+                "rank": float(rank),
+                "cobertura": float(cobertura),
+                "termos": termos,
+            }
+            for documento_id, titulo, url, paragrafo, rank, cobertura, termos in cursor.fetchall()
+        ]
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from metricas import metricas
+
+EMBEDDING_CACHE_ARQUIVO = os.environ.get("EMBEDDING_CACHE_ARQUIVO", "cache_embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ITENS = int(os.environ.get("EMBEDDING_CACHE_MAX_ITENS", "200000"))
+
+
+def chave_embedding(modelo, texto):
+    return hashlib.sha256(f"{modelo}\0{texto}".encode("utf-8")).hexdigest()
+
+
+class CacheEmbeddings:
+    def __init__(self, arquivo=EMBEDDING_CACHE_ARQUIVO, max_itens=EMBEDDING_CACHE_MAX_ITENS):
+        self.max_itens = max_itens
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(arquivo, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding (
+                chave TEXT PRIMARY KEY,
+                vetor BLOB NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embedding_acessado_idx ON embedding (acessado_em)")
+        self._total = self._conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+        self._versao_dados = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def obter_varios(self, modelo, textos):
+        chaves = [chave_embedding(modelo, texto) for texto in textos]
+        unicas = list(set(chaves))
+        encontrados = {}
+        with self._lock:
+            for inicio in range(0, len(unicas), 500):
+                parte = unicas[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(parte))
+                for chave, vetor in self._conn.execute(
+                    f"SELECT chave, vetor FROM embedding WHERE chave IN ({marcadores})", parte
+                ):
+                    encontrados[chave] = np.frombuffer(vetor, dtype="<f4")
+            if encontrados:
+                agora = time.time()
+                self._conn.executemany(
+                    "UPDATE embedding SET acessado_em = ? WHERE chave = ?",
+                    [(agora, chave) for chave in encontrados],
+                )
+            resultado = {i: encontrados[chave] for i, chave in enumerate(chaves) if chave in encontrados}
+        if resultado:
+            metricas.contar("cache_embeddings", "acerto", len(resultado))
+        if len(chaves) > len(resultado):
+            metricas.contar("cache_embeddings", "falha", len(chaves) - len(resultado))
+        return resultado
+
+    def salvar_varios(self, modelo, textos, vetores):
+        agora = time.time()
+        linhas = [
+            (chave_embedding(modelo, texto), np.asarray(vetor, dtype="<f4").tobytes(), agora)
+            for texto, vetor in zip(textos, vetores)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                versao = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if versao != self._versao_dados:
+                    self._total = self._conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+                    self._versao_dados = versao
+                antes = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embedding (chave, vetor, acessado_em) VALUES (?, ?, ?)", linhas
+                )
+                self._total += self._conn.total_changes - antes
+                if self._total > self.max_itens:
+                    self._total = self._conn.execute("SELECT COUNT(*) FROM embedding").fetchone()[0]
+                if self._total > self.max_itens:
+                    excesso = self._total - int(self.max_itens * 0.9)
+                    self._conn.execute(
+                        """
+                        DELETE FROM embedding WHERE chave IN (
+                            SELECT chave FROM embedding ORDER BY acessado_em LIMIT ?
+                        )
+                        """,
+                        (excesso,),
+                    )
+                    self._total -= excesso
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheEmbeddings()
+        return _cache
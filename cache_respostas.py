@@ -0,0 +1,216 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from palavras_chave import normalizar_texto
+
+CACHE_RESPOSTAS_ARQUIVO = os.environ.get("CACHE_RESPOSTAS_ARQUIVO", "cache_respostas.sqlite3")
+CACHE_RESPOSTAS_TTL = float(os.environ.get("CACHE_RESPOSTAS_TTL", str(7 * 24 * 3600)))
+CACHE_RESPOSTAS_MAX_ITENS = int(os.environ.get("CACHE_RESPOSTAS_MAX_ITENS", "50000"))
+CACHE_RESPOSTAS_MEMORIA = int(os.environ.get("CACHE_RESPOSTAS_MEMORIA", "1000"))
+CACHE_RESPOSTAS_LIMPEZA_A_CADA = 100
+CACHE_SEMANTICO_LIMIAR = float(os.environ.get("CACHE_SEMANTICO_LIMIAR", "0.98"))
+CACHE_SEMANTICO_SOBREPOSICAO = float(os.environ.get("CACHE_SEMANTICO_SOBREPOSICAO", "0"))
+CACHE_SEMANTICO_RECARGA = float(os.environ.get("CACHE_SEMANTICO_RECARGA", "60"))
+
+
+def chave_resposta(subcategoria_id, pergunta):
+    return f"{subcategoria_id}|{pergunta.lower()}"
+
+
+def sobreposicao_lexica(a, b):
+    palavras_a = set(re.findall(r"\w+", normalizar_texto(a)))
+    palavras_b = set(re.findall(r"\w+", normalizar_texto(b)))
+    if not palavras_a or not palavras_b:
+        return 0.0
+    return len(palavras_a & palavras_b) / len(palavras_a | palavras_b)
+
+
+class CacheRespostas:
+    def __init__(
+        self,
+        arquivo=CACHE_RESPOSTAS_ARQUIVO,
+        ttl=CACHE_RESPOSTAS_TTL,
+        max_itens=CACHE_RESPOSTAS_MAX_ITENS,
+        itens_memoria=CACHE_RESPOSTAS_MEMORIA,
+    ):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.itens_memoria = itens_memoria
+        self._memoria = OrderedDict()
+        self._escritas = 0
+        self._semantico = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(arquivo, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resposta (
+                chave TEXT PRIMARY KEY,
+                subcategoria_id INTEGER NOT NULL,
+                resposta TEXT NOT NULL,
+                url TEXT,
+                score REAL,
+                versao TEXT,
+                criado_em REAL NOT NULL,
+                embedding BLOB
+            )
+            """
+        )
+        colunas = [row[1] for row in self._conn.execute("PRAGMA table_info(resposta)")]
+        if "embedding" not in colunas:
+            self._conn.execute("ALTER TABLE resposta ADD COLUMN embedding BLOB")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS resposta_subcategoria_idx ON resposta (subcategoria_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS resposta_criado_idx ON resposta (criado_em)")
+
+    def _valida(self, entrada, versao):
+        return time.time() - entrada["criado_em"] <= self.ttl and entrada["versao"] == versao
+
+    def _lembrar(self, chave, entrada):
+        self._memoria[chave] = entrada
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.itens_memoria:
+            self._memoria.popitem(last=False)
+
+    def obter(self, chave, versao):
+        with self._lock:
+            entrada = self._memoria.get(chave)
+            if entrada is None:
+                row = self._conn.execute(
+                    "SELECT resposta, url, score, versao, criado_em FROM resposta WHERE chave = ?",
+                    (chave,),
+                ).fetchone()
+                if row is None:
+                    return None
+                resposta, url, score, versao_salva, criado_em = row
+                entrada = {
+                    "resposta": resposta,
+                    "url": url,
+                    "score": score,
+                    "versao": versao_salva,
+                    "criado_em": criado_em,
+                }
+            if not self._valida(entrada, versao):
+                self._memoria.pop(chave, None)
+                self._conn.execute("DELETE FROM resposta WHERE chave = ?", (chave,))
+                return None
+            self._lembrar(chave, entrada)
+            return entrada
+
+    def salvar(self, chave, subcategoria_id, resposta, url, score, versao, embedding=None):
+        entrada = {
+            "resposta": resposta,
+            "url": url,
+            "score": score,
+            "versao": versao,
+            "criado_em": time.time(),
+        }
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """
+                    INSERT OR REPLACE INTO resposta
+                        (chave, subcategoria_id, resposta, url, score, versao, criado_em, embedding)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        chave, subcategoria_id, resposta, url, score, versao, entrada["criado_em"],
+                        None if embedding is None else np.asarray(embedding, dtype="<f4").tobytes(),
+                    ),
+                )
+                self._escritas += 1
+                if self._escritas % CACHE_RESPOSTAS_LIMPEZA_A_CADA == 0:
+                    self._limpar()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._lembrar(chave, entrada)
+            if embedding is not None:
+                self._adicionar_semantico(subcategoria_id, versao, chave, embedding)
+
+    def _carregar_semantico(self, subcategoria_id, versao):
+        chaves, vetores = [], []
+        for chave, embedding in self._conn.execute(
+            """
+            SELECT chave, embedding FROM resposta
+            WHERE subcategoria_id = ? AND versao = ? AND embedding IS NOT NULL AND criado_em >= ?
+            """,
+            (subcategoria_id, versao, time.time() - self.ttl),
+        ):
+            chaves.append(chave)
+            vetores.append(np.frombuffer(embedding, dtype="<f4"))
+        matriz = np.vstack(vetores) if vetores else np.empty((0, 0), dtype=np.float32)
+        if len(matriz):
+            matriz = matriz / np.linalg.norm(matriz, axis=1, keepdims=True).clip(min=1e-12)
+        semantico = {"versao": versao, "chaves": chaves, "matriz": matriz, "carregado_em": time.monotonic()}
+        self._semantico[subcategoria_id] = semantico
+        return semantico
+
+    def _adicionar_semantico(self, subcategoria_id, versao, chave, embedding):
+        semantico = self._semantico.get(subcategoria_id)
+        if not semantico or semantico["versao"] != versao:
+            return
+        vetor = np.asarray(embedding, dtype=np.float32)
+        vetor = vetor / max(float(np.linalg.norm(vetor)), 1e-12)
+        if chave in semantico["chaves"]:
+            semantico["matriz"][semantico["chaves"].index(chave)] = vetor
+        elif len(semantico["matriz"]):
+            semantico["matriz"] = np.vstack([semantico["matriz"], vetor])
+            semantico["chaves"].append(chave)
+        else:
+            semantico["matriz"] = vetor[np.newaxis, :]
+            semantico["chaves"].append(chave)
+
+    def buscar_semelhante(self, subcategoria_id, pergunta, embedding, versao, limiar=CACHE_SEMANTICO_LIMIAR,
+                          sobreposicao=CACHE_SEMANTICO_SOBREPOSICAO):
+        with self._lock:
+            semantico = self._semantico.get(subcategoria_id)
+            if (
+                not semantico
+                or semantico["versao"] != versao
+                or time.monotonic() - semantico["carregado_em"] > CACHE_SEMANTICO_RECARGA
+            ):
+                semantico = self._carregar_semantico(subcategoria_id, versao)
+            if not len(semantico["matriz"]):
+                return None
+            vetor = np.asarray(embedding, dtype=np.float32)
+            scores = semantico["matriz"] @ (vetor / max(float(np.linalg.norm(vetor)), 1e-12))
+            candidatos = np.flatnonzero(scores >= limiar)
+            chave = None
+            for i in candidatos[np.argsort(-scores[candidatos])]:
+                chave_candidata = semantico["chaves"][i]
+                if sobreposicao <= 0 or sobreposicao_lexica(pergunta, chave_candidata.split("|", 1)[1]) >= sobreposicao:
+                    chave, similaridade = chave_candidata, float(scores[i])
+                    break
+            if chave is None:
+                return None
+        entrada = self.obter(chave, versao)
+        if entrada is None:
+            return None
+        return dict(entrada, similaridade_pergunta=similaridade)
+
+    def _limpar(self):
+        self._conn.execute("DELETE FROM resposta WHERE criado_em < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            """
+            DELETE FROM resposta WHERE chave IN (
+                SELECT chave FROM resposta ORDER BY criado_em DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_itens,),
+        )
+
+    def invalidar_subcategoria(self, subcategoria_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM resposta WHERE subcategoria_id = ?", (subcategoria_id,))
+            for chave in [c for c in self._memoria if c.startswith(f"{subcategoria_id}|")]:
+                del self._memoria[chave]
+            self._semantico.pop(subcategoria_id, None)
@@ -0,0 +1,169 @@
+import os
+import re
+
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+from ingestao_embeddings import estimar_tokens
+
+CHUNKER = os.environ.get("CHUNKER", "paragrafo")
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "256"))
+CHUNK_SOBREPOSICAO = int(os.environ.get("CHUNK_SOBREPOSICAO", "32"))
+CHUNK_MIN_CARACTERES = 20
+
+ESTILO_TITULO = re.compile(r"^(?:heading|t[ií]tulo)\s*(\d+)$", re.IGNORECASE)
+
+
+def blocos(doc):
+    for elemento in doc.element.body.iterchildren():
+        if elemento.tag == qn("w:p"):
+            yield Paragraph(elemento, doc)
+        elif elemento.tag == qn("w:tbl"):
+            yield Table(elemento, doc)
+
+
+def nivel_titulo(paragrafo):
+    nome = paragrafo.style.name if paragrafo.style is not None else ""
+    if nome.lower() in ("title", "título", "titulo"):
+        return 0
+    encontrado = ESTILO_TITULO.match(nome.strip())
+    return int(encontrado.group(1)) if encontrado else None
+
+
+def linhas_tabela(tabela):
+    linhas = []
+    for linha in tabela.rows:
+        celulas = []
+        for celula in linha.cells:
+            texto = " ".join(celula.text.split())
+            if texto and (not celulas or celulas[-1] != texto):
+                celulas.append(texto)
+        if celulas:
+            linhas.append(celulas)
+    if len(linhas) < 2:
+        return [" | ".join(celulas) for celulas in linhas]
+    cabecalho = linhas[0]
+    return [
+        "; ".join(f"{coluna}: {valor}" for coluna, valor in zip(cabecalho, celulas))
+        if len(celulas) == len(cabecalho)
+        else " | ".join(celulas)
+        for celulas in linhas[1:]
+    ]
+
+
+class ChunkerParagrafo:
+    def __init__(self, min_caracteres=CHUNK_MIN_CARACTERES):
+        self.min_caracteres = min_caracteres
+
+    def dividir(self, doc):
+        textos = (p.text.strip() for p in doc.paragraphs)
+        return [texto for texto in textos if len(texto) > self.min_caracteres]
+
+
+class ChunkerTokens:
+    def __init__(self, max_tokens=CHUNK_MAX_TOKENS, sobreposicao=CHUNK_SOBREPOSICAO,
+                 min_caracteres=CHUNK_MIN_CARACTERES, tabelas=True, titulos=True):
+        self.max_tokens = max_tokens
+        self.sobreposicao = sobreposicao
+        self.min_caracteres = min_caracteres
+        self.tabelas = tabelas
+        self.titulos = titulos
+
+    def secoes(self, doc):
+        caminho, unidades = [], []
+        for bloco in blocos(doc):
+            if isinstance(bloco, Table):
+                if self.tabelas:
+                    unidades.extend(linhas_tabela(bloco))
+                continue
+            texto = " ".join(bloco.text.split())
+            if not texto:
+                continue
+            nivel = nivel_titulo(bloco)
+            if nivel is None:
+                unidades.append(texto)
+                continue
+            if unidades:
+                yield " > ".join(t for _, t in caminho), unidades
+                unidades = []
+            while caminho and caminho[-1][0] >= nivel:
+                caminho.pop()
+            caminho.append((nivel, texto))
+        if unidades:
+            yield " > ".join(t for _, t in caminho), unidades
+
+    def empacotar(self, prefixo, unidades):
+        prefixo = prefixo if self.titulos else ""
+        orcamento = max(self.max_tokens - (estimar_tokens(prefixo) if prefixo else 0), 16)
+        sobreposicao = min(self.sobreposicao, orcamento // 2)
+        palavras, fim_unidade = [], {}
+        for unidade in unidades:
+            itens = unidade.split()
+            itens[-1] += "\n"
+            fim_unidade[len(palavras)] = len(palavras) + len(itens)
+            palavras.extend(itens)
+        acumulado = [0]
+        for palavra in palavras:
+            acumulado.append(acumulado[-1] + estimar_tokens(palavra))
+
+        def soma(inicio, fim):
+            return acumulado[fim] - acumulado[inicio]
+
+        def montar(inicio, fim):
+            texto = " ".join(palavras[inicio:fim]).replace("\n ", "\n").strip()
+            return f"{prefixo}\n{texto}" if prefixo else texto
+
+        def cabe(inicio, fim):
+            return estimar_tokens(montar(inicio, fim)) <= self.max_tokens
+
+        chunks, inicio, novas = [], 0, 0
+        while novas < len(palavras):
+            fim = inicio
+            while fim < len(palavras):
+                if fim > inicio and fim in fim_unidade:
+                    final = fim_unidade[fim]
+                    if soma(inicio, final) > orcamento and soma(fim, final) <= orcamento:
+                        if fim > novas:
+                            break
+                        inicio = fim
+                if fim > max(inicio, novas) and soma(inicio, fim + 1) > orcamento:
+                    break
+                fim += 1
+
+            if not cabe(inicio, fim):
+                if inicio < novas and not cabe(inicio, novas + 1):
+                    inicio = novas
+                baixo, alto = novas + 1, fim
+                while baixo < alto:
+                    meio = (baixo + alto + 1) // 2
+                    if cabe(inicio, meio):
+                        baixo = meio
+                    else:
+                        alto = meio - 1
+                fim = baixo
+
+            chunks.append(montar(inicio, fim))
+            primeiro, inicio, novas = inicio, fim, fim
+            while inicio > primeiro and soma(inicio - 1, fim) <= sobreposicao:
+                inicio -= 1
+        return chunks
+
+    def dividir(self, doc):
+        chunks = []
+        for prefixo, unidades in self.secoes(doc):
+            chunks.extend(self.empacotar(prefixo, unidades))
+        return [chunk for chunk in chunks if len(chunk) > self.min_caracteres]
+
+
+CHUNKERS = {
+    "paragrafo": ChunkerParagrafo,
+    "tokens": ChunkerTokens,
+}
+
+
+def obter_chunker(nome=None, **opcoes):
+    nome = nome or CHUNKER
+    if nome not in CHUNKERS:
+        raise ValueError(f"Chunker desconhecido: {nome} (use {', '.join(CHUNKERS)})")
+    return CHUNKERS[nome](**opcoes)
@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from db import executar_preparada
+from ingestao_embeddings import gerar_embedding, gerar_embeddings
+from palavras_chave import AhoCorasick, limite_de_palavra, normalizar_texto
+
+CLASSIFICADOR_VERIFICACAO_SEGUNDOS = float(os.environ.get("CLASSIFICADOR_VERIFICACAO_SEGUNDOS", "60"))
+CLASSIFICADOR_EMBEDDINGS = os.environ.get("CLASSIFICADOR_EMBEDDINGS", "0") == "1"
+CLASSIFICADOR_LIMIAR = float(os.environ.get("CLASSIFICADOR_LIMIAR", "0.8"))
+
+NOME_OUTROS = "Outros"
+DESCRICAO_OUTROS = "Criada automaticamente"
+
+SQL_ASSINATURA = """
+    SELECT
+        (SELECT md5(COALESCE(string_agg(categoria_id || ':' || nome, ',' ORDER BY categoria_id), ''))
+         FROM bloqueio_v2.categoria),
+        (SELECT md5(COALESCE(string_agg(subcategoria_id || ':' || categoria_id || ':' || nome, ',' ORDER BY subcategoria_id), ''))
+         FROM bloqueio_v2.subcategoria)
+"""
+
+SQL_SUBCATEGORIAS = """
+    SELECT subcategoria_id, categoria_id, nome FROM bloqueio_v2.subcategoria ORDER BY subcategoria_id
+"""
+
+class IndiceNomes:
+    def __init__(self, itens):
+        self.ids = [item_id for item_id, _ in itens]
+        self.nomes = [nome for _, nome in itens]
+        self.ordem = {item_id: i for i, item_id in enumerate(self.ids)}
+        self.por_nome = {}
+        self.automato = AhoCorasick()
+        for item_id, nome in itens:
+            chave = normalizar_texto(nome or "").strip()
+            if chave:
+                self.por_nome.setdefault(chave, item_id)
+                self.automato.adicionar(chave, item_id)
+        self.automato.construir()
+        self.vetores = None
+
+    def procurar(self, texto_normalizado):
+        encontrados = [
+            item_id
+            for inicio, fim, padrao in self.automato.buscar(texto_normalizado)
+            if limite_de_palavra(texto_normalizado, inicio, fim)
+            for item_id in self.automato.valores(padrao)
+        ]
+        return min(encontrados, key=self.ordem.get) if encontrados else None
+
+    def mais_proximo(self, vetor, limiar):
+        if self.vetores is None or not len(self.vetores):
+            return None
+        consulta = np.asarray(vetor, dtype=np.float32)
+        scores = self.vetores @ (consulta / max(float(np.linalg.norm(consulta)), 1e-12))
+        melhor = int(np.argmax(scores))
+        return self.ids[melhor] if scores[melhor] >= limiar else None
+
+
+class Classificador:
+    def __init__(self, usar_embeddings=CLASSIFICADOR_EMBEDDINGS, limiar=CLASSIFICADOR_LIMIAR):
+        self.usar_embeddings = usar_embeddings
+        self.limiar = limiar
+        self._categorias = None
+        self._subcategorias = {}
+        self._assinatura = None
+        self._verificado_em = 0.0
+        self._lock = threading.RLock()
+
+    def _carregar(self, cursor, assinatura):
+        executar_preparada(cursor, "categorias", "SELECT categoria_id, nome FROM bloqueio_v2.categoria")
+        self._categorias = IndiceNomes(cursor.fetchall())
+        executar_preparada(cursor, "classificador_subcategorias", SQL_SUBCATEGORIAS)
+        por_categoria = {}
+        for subcategoria_id, categoria_id, nome in cursor.fetchall():
+            por_categoria.setdefault(categoria_id, []).append((subcategoria_id, nome))
+        self._subcategorias = {cid: IndiceNomes(itens) for cid, itens in por_categoria.items()}
+        if self.usar_embeddings:
+            self._calcular_vetores()
+        self._assinatura = assinatura
+
+    def _calcular_vetores(self):
+        indices = [self._categorias] + list(self._subcategorias.values())
+        nomes = [nome or "" for indice in indices for nome in indice.nomes]
+        vetores = np.asarray(gerar_embeddings(nomes), dtype=np.float32) if nomes else np.empty((0, 0))
+        inicio = 0
+        for indice in indices:
+            parte = vetores[inicio:inicio + len(indice.nomes)]
+            inicio += len(indice.nomes)
+            if len(parte):
+                parte = parte / np.linalg.norm(parte, axis=1, keepdims=True).clip(min=1e-12)
+            indice.vetores = parte
+
+    def atualizar(self, cursor, forcar=False):
+        with self._lock:
+            if not forcar and self._categorias is not None and (
+                time.monotonic() - self._verificado_em < CLASSIFICADOR_VERIFICACAO_SEGUNDOS
+            ):
+                return
+            executar_preparada(cursor, "classificador_assinatura", SQL_ASSINATURA)
+            assinatura = tuple(cursor.fetchone())
+            if forcar or assinatura != self._assinatura:
+                self._carregar(cursor, assinatura)
+            self._verificado_em = time.monotonic()
+
+    def _obter_ou_criar_categoria(self, cursor, nome):
+        cursor.execute(
+            """
+            INSERT INTO bloqueio_v2.categoria AS c (nome, descricao) VALUES (%s, %s)
+            ON CONFLICT ((lower(nome))) DO UPDATE SET nome = c.nome
+            RETURNING categoria_id
+            """,
+            (nome, DESCRICAO_OUTROS),
+        )
+        return cursor.fetchone()[0]
+
+    def _obter_ou_criar_subcategoria(self, cursor, categoria_id, nome):
+        cursor.execute(
+            """
+            INSERT INTO bloqueio_v2.subcategoria AS s (categoria_id, nome, descricao) VALUES (%s, %s, %s)
+            ON CONFLICT (categoria_id, (lower(nome))) DO UPDATE SET nome = s.nome
+            RETURNING subcategoria_id
+            """,
+            (categoria_id, nome, DESCRICAO_OUTROS),
+        )
+        return cursor.fetchone()[0]
+
+    def classificar(self, cursor, resumo, vetor=None):
+        self.atualizar(cursor)
+        texto = normalizar_texto(resumo)
+
+        def vetor_resumo():
+            nonlocal vetor
+            if vetor is None and self.usar_embeddings:
+                vetor = gerar_embedding(resumo)
+            return vetor
+
+        with self._lock:
+            categorias = self._categorias
+            subcategorias_por_categoria = self._subcategorias
+
+        categoria_id = categorias.procurar(texto)
+        if categoria_id is None and vetor_resumo() is not None:
+            categoria_id = categorias.mais_proximo(vetor, self.limiar)
+        if categoria_id is None:
+            categoria_id = categorias.por_nome.get(normalizar_texto(NOME_OUTROS))
+
+        subcategorias = subcategorias_por_categoria.get(categoria_id)
+        subcategoria_id = None
+        if subcategorias is not None:
+            subcategoria_id = subcategorias.procurar(texto)
+            if subcategoria_id is None and vetor_resumo() is not None:
+                subcategoria_id = subcategorias.mais_proximo(vetor, self.limiar)
+            if subcategoria_id is None:
+                subcategoria_id = subcategorias.por_nome.get(normalizar_texto(NOME_OUTROS))
+
+        if categoria_id is None:
+            categoria_id = self._obter_ou_criar_categoria(cursor, NOME_OUTROS)
+        if subcategoria_id is None:
+            subcategoria_id = self._obter_ou_criar_subcategoria(cursor, categoria_id, NOME_OUTROS)
+        return categoria_id, subcategoria_id
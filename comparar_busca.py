@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+from contextlib import closing
+
+import numpy as np
+
+from busca_pgvector import BuscaPgvector
+from db import conectar
+from indice_embeddings import IndiceEmbeddings
+
+K = int(os.environ.get("COMPARAR_K", "10"))
+CONSULTAS = int(os.environ.get("COMPARAR_CONSULTAS", "100"))
+RUIDO = float(os.environ.get("COMPARAR_RUIDO", "0.02"))
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) * 1000 if valores else 0.0
+
+
+def medir(busca, cursor, subcategoria_id, consultas, **opcoes):
+    resultados, tempos = [], []
+    for vetor in consultas:
+        inicio = time.perf_counter()
+        achados = busca.buscar(cursor, subcategoria_id, vetor, k=K, **opcoes)
+        tempos.append(time.perf_counter() - inicio)
+        resultados.append([(r["documento_id"], r["paragrafo"]) for r in achados])
+    return resultados, tempos
+
+
+def comparar(cursor, subcategoria_id):
+    exata = IndiceEmbeddings(intervalo_verificacao=float("inf"))
+    indice = exata.obter(cursor, subcategoria_id)
+    if len(indice) == 0:
+        print("Subcategoria sem parágrafos.")
+        return
+
+    rng = np.random.default_rng(42)
+    linhas = rng.choice(len(indice), size=min(CONSULTAS, len(indice)), replace=False)
+    consultas = [
+        indice.matriz[i] + rng.normal(0, RUIDO, indice.matriz.shape[1]).astype(np.float32)
+        for i in linhas
+    ]
+
+    esperados, tempos_exata = medir(exata, cursor, subcategoria_id, consultas, prefiltro=0)
+    obtidos, tempos_ann = medir(BuscaPgvector(), cursor, subcategoria_id, consultas)
+
+    recall = np.mean([
+        len(set(e) & set(o)) / len(e) for e, o in zip(esperados, obtidos) if e
+    ])
+    print(f"Parágrafos na subcategoria: {len(indice)} | consultas: {len(consultas)} | k={K}")
+    print(f"Recall@{K} pgvector vs. exata: {recall:.4f}")
+    for nome, tempos in (("exata (cliente)", tempos_exata), ("pgvector", tempos_ann)):
+        print(
+            f"{nome:>16}: p50={percentil(tempos, 50):.2f}ms "
+            f"p95={percentil(tempos, 95):.2f}ms p99={percentil(tempos, 99):.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python comparar_busca.py <subcategoria_id>")
+        sys.exit(1)
+
+    conn = None
+    try:
+        conn = conectar()
+        with closing(conn.cursor()) as cursor:
+            comparar(cursor, int(sys.argv[1]))
+    except Exception as e:
+        print(f"Erro na comparação: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,88 @@
+import math
+import os
+import sys
+from contextlib import closing
+
+
+from db import conectar
+from migrar_embeddings import EMBEDDING_DIMENSAO, ler_dimensao, migrar_tabela
+
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+
+TIPOS_INDICE = ("hnsw", "ivfflat")
+
+
+def criar_indices(cursor, tipo, dimensao=None):
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    migrar_tabela(cursor, "documento_paragrafo_embedding", "pgvector", dimensao)
+    migrar_tabela(cursor, "documento_embedding", "pgvector", dimensao)
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS documento_subcategoria_idx "
+        "ON bloqueio_v2.documento (subcategoria_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS documento_paragrafo_embedding_documento_idx "
+        "ON bloqueio_v2.documento_paragrafo_embedding (documento_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS documento_embedding_documento_idx "
+        "ON bloqueio_v2.documento_embedding (documento_id)"
+    )
+
+    cursor.execute("DROP INDEX IF EXISTS bloqueio_v2.documento_paragrafo_embedding_ann_idx")
+    if tipo == "hnsw":
+        cursor.execute(
+            f"""
+            CREATE INDEX documento_paragrafo_embedding_ann_idx
+            ON bloqueio_v2.documento_paragrafo_embedding
+            USING hnsw (embedding vector_cosine_ops)
+            WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+            """
+        )
+        print(f"Índice HNSW criado (m={HNSW_M}, ef_construction={HNSW_EF_CONSTRUCTION}).")
+    else:
+        cursor.execute("SELECT COUNT(*) FROM bloqueio_v2.documento_paragrafo_embedding")
+        total = cursor.fetchone()[0]
+        listas = max(1, total // 1000 if total <= 1_000_000 else int(math.sqrt(total)))
+        cursor.execute(
+            f"""
+            CREATE INDEX documento_paragrafo_embedding_ann_idx
+            ON bloqueio_v2.documento_paragrafo_embedding
+            USING ivfflat (embedding vector_cosine_ops)
+            WITH (lists = {listas})
+            """
+        )
+        print(f"Índice IVFFlat criado (lists={listas}, {total} parágrafos).")
+    cursor.execute("ANALYZE bloqueio_v2.documento_paragrafo_embedding")
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    tipo = argumentos[0] if argumentos and not argumentos[0].startswith("--") else "hnsw"
+    try:
+        dimensao = ler_dimensao(argumentos)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if tipo not in TIPOS_INDICE:
+        print(f"Uso: python criar_indice_pgvector.py [{'|'.join(TIPOS_INDICE)}] [--dimensao N]")
+        print(f"  --dimensao: dimensão da coluna vector quando a tabela está vazia (padrão {EMBEDDING_DIMENSAO})")
+        sys.exit(1)
+
+    conn = None
+    try:
+        conn = conectar()
+        with closing(conn.cursor()) as cursor:
+            criar_indices(cursor, tipo, dimensao)
+        conn.commit()
+        print("Defina BUSCA_BACKEND=pgvector e EMBEDDING_FORMATO=pgvector no ambiente.")
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Erro ao criar índices: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,211 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from metricas import metricas
+
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_NAME = os.environ.get("DB_NAME", "postgres")
+DB_USER = os.environ.get("DB_USER", "postgres")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
+DB_PORT = os.environ.get("DB_PORT", "5432")
+
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "8"))
+DB_VERIFICAR_APOS = float(os.environ.get("DB_VERIFICAR_APOS", "30"))
+DB_LOG_LENTAS_MS = float(os.environ.get("DB_LOG_LENTAS_MS", "500"))
+
+ERROS_CONEXAO = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class ConexaoPreparada(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+        self.usada_em = time.monotonic()
+
+
+def parametros_conexao(dsn=None):
+    if dsn:
+        return {"dsn": dsn, "connection_factory": ConexaoPreparada}
+    return {
+        "host": DB_HOST,
+        "dbname": DB_NAME,
+        "user": DB_USER,
+        "password": DB_PASSWORD,
+        "port": DB_PORT,
+        "connection_factory": ConexaoPreparada,
+    }
+
+
+def conexao_perdida(erro):
+    codigo = getattr(erro, "pgcode", None)
+    return codigo is None or codigo.startswith(("08", "57P"))
+
+
+def conectar():
+    return psycopg2.connect(**parametros_conexao())
+
+
+def registrar_consulta(nome, duracao):
+    metricas.observar("consulta", nome, duracao)
+    if duracao * 1000 >= DB_LOG_LENTAS_MS:
+        print(f"Consulta lenta '{nome}': {duracao * 1000:.1f}ms")
+
+
+def para_placeholders_posicionais(sql):
+    contador = iter(range(1, sql.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(contador)}", sql)
+
+
+def executar(cursor, nome, sql, params=None):
+    inicio = time.perf_counter()
+    try:
+        cursor.execute(sql, params)
+    finally:
+        registrar_consulta(nome, time.perf_counter() - inicio)
+
+
+def executar_preparada(cursor, nome, sql, params=()):
+    conn = cursor.connection
+    if not isinstance(conn, ConexaoPreparada):
+        executar(cursor, nome, sql, params)
+        return
+    inicio = time.perf_counter()
+    try:
+        if nome not in conn.preparadas:
+            cursor.execute(f"PREPARE {nome} AS {para_placeholders_posicionais(sql)}")
+            conn.preparadas.add(nome)
+        if params:
+            cursor.execute(f"EXECUTE {nome} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {nome}")
+    finally:
+        registrar_consulta(nome, time.perf_counter() - inicio)
+
+
+def listar_categorias(cursor):
+    executar_preparada(cursor, "categorias", "SELECT categoria_id, nome FROM bloqueio_v2.categoria")
+    return cursor.fetchall()
+
+
+def listar_subcategorias(cursor, categoria_id):
+    executar_preparada(
+        cursor,
+        "subcategorias",
+        "SELECT subcategoria_id, nome FROM bloqueio_v2.subcategoria WHERE categoria_id = %s",
+        (categoria_id,),
+    )
+    return cursor.fetchall()
+
+
+def listar_todas_subcategorias(cursor):
+    executar_preparada(
+        cursor,
+        "todas_subcategorias",
+        "SELECT categoria_id, subcategoria_id, nome FROM bloqueio_v2.subcategoria ORDER BY categoria_id, subcategoria_id",
+    )
+    return cursor.fetchall()
+
+
+class BancoDados:
+    def __init__(self, minimo=DB_POOL_MIN, maximo=DB_POOL_MAX, dsn=None):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.dsn = dsn
+        self._pool = None
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(maximo)
+        self._falha_em = 0.0
+
+    def _obter_pool(self):
+        with self._lock:
+            if self._pool is None or self._pool.closed:
+                self._pool = ThreadedConnectionPool(self.minimo, self.maximo, **parametros_conexao(self.dsn))
+            return self._pool
+
+    def _conexao_saudavel(self, conn):
+        if conn.closed:
+            return False
+        if conn.usada_em > self._falha_em and time.monotonic() - conn.usada_em < DB_VERIFICAR_APOS:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except ERROS_CONEXAO:
+            return False
+
+    def _emprestar(self):
+        pool = self._obter_pool()
+        for _ in range(self.maximo + 1):
+            conn = pool.getconn()
+            if self._conexao_saudavel(conn):
+                return pool, conn
+            pool.putconn(conn, close=True)
+        raise PoolError("Não foi possível obter uma conexão saudável do pool.")
+
+    @contextmanager
+    def conexao(self):
+        with self._vagas:
+            with self._conexao_emprestada() as conn:
+                yield conn
+
+    @contextmanager
+    def _conexao_emprestada(self):
+        pool, conn = self._emprestar()
+        descartar = False
+        try:
+            yield conn
+        except ERROS_CONEXAO as e:
+            descartar = True
+            if conexao_perdida(e):
+                self._falha_em = time.monotonic()
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if not descartar and not conn.closed:
+                try:
+                    conn.rollback()
+                except ERROS_CONEXAO:
+                    descartar = True
+                    self._falha_em = time.monotonic()
+            conn.usada_em = time.monotonic()
+            pool.putconn(conn, close=descartar or conn.closed)
+
+    @contextmanager
+    def cursor(self, commit=False):
+        with self.conexao() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+            if commit:
+                conn.commit()
+
+    def com_cursor(self, funcao, *args, **kwargs):
+        for tentativa in range(self.maximo + 1):
+            try:
+                with self.cursor() as cursor:
+                    return funcao(cursor, *args, **kwargs)
+            except ERROS_CONEXAO as e:
+                if not conexao_perdida(e) or tentativa == self.maximo:
+                    raise
+                metricas.contar("banco", "reconexao")
+
+    def com_transacao(self, funcao, *args, **kwargs):
+        with self.cursor(commit=True) as cursor:
+            return funcao(cursor, *args, **kwargs)
+
+    def fechar(self):
+        with self._lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
@@ -0,0 +1,147 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoPendente
+
+from metricas import metricas
+
+EXECUCAO_WORKERS = int(os.environ.get("EXECUCAO_WORKERS", "4"))
+EXECUCAO_INTERVALO_VERIFICACAO = 0.05
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class EtapaExpirada(Exception):
+    def __init__(self, etapa, timeout):
+        super().__init__(f"A etapa '{etapa}' excedeu o tempo limite de {timeout:g}s.")
+        self.etapa = etapa
+        self.timeout = timeout
+
+
+class Tarefa:
+    _ids = itertools.count(1)
+
+    def __init__(self, executor):
+        self.id = next(self._ids)
+        self._executor = executor
+        self._cancelada = threading.Event()
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    def verificar(self):
+        if self._cancelada.is_set():
+            raise TarefaCancelada()
+
+    def emitir(self, tipo, dados=None):
+        self._executor.fila.put((self, tipo, dados))
+
+    def etapa(self, nome, funcao, *args, timeout=None, cancelavel=False, **kwargs):
+        self.verificar()
+        inicio = time.perf_counter()
+        status = "erro"
+        try:
+            resultado = self._aguardar(nome, funcao, args, kwargs, timeout, cancelavel)
+            status = "ok"
+            return resultado
+        except TarefaCancelada:
+            status = "cancelada"
+            raise
+        except EtapaExpirada:
+            status = "expirada"
+            raise
+        finally:
+            metricas.observar("etapa", nome, time.perf_counter() - inicio, status)
+
+    def _aguardar(self, nome, funcao, args, kwargs, timeout, cancelavel):
+        expirada = threading.Event()
+        if cancelavel:
+            kwargs = {**kwargs, "cancelada": lambda: expirada.is_set() or self._cancelada.is_set()}
+        futuro = self._executor.etapas.submit(funcao, *args, **kwargs)
+        limite = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                resultado = futuro.result(timeout=EXECUCAO_INTERVALO_VERIFICACAO)
+                self.verificar()
+                return resultado
+            except FuturoPendente:
+                pass
+            if self._cancelada.is_set():
+                self._executor.abandonar(nome, futuro)
+                raise TarefaCancelada()
+            if limite and time.monotonic() > limite:
+                expirada.set()
+                self._executor.abandonar(nome, futuro)
+                raise EtapaExpirada(nome, timeout)
+
+
+class Executor:
+    def __init__(self, workers=EXECUCAO_WORKERS):
+        self.fila = queue.Queue()
+        self.tarefas = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tarefa")
+        self.max_etapas = workers * 2
+        self.etapas = ThreadPoolExecutor(max_workers=self.max_etapas, thread_name_prefix="etapa")
+        self._orfas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def etapas_orfas(self):
+        with self._lock:
+            return self._orfas
+
+    def abandonar(self, nome, futuro):
+        if futuro.cancel():
+            return
+        inicio = time.perf_counter()
+        with self._lock:
+            self._orfas += 1
+            orfas = self._orfas
+        metricas.contar("etapa_abandonada", nome)
+        if orfas >= self.max_etapas:
+            print(f"Todas as {orfas} threads de etapas ainda executam etapas expiradas ou canceladas.")
+        futuro.add_done_callback(lambda _: self._liberar_orfa(nome, inicio))
+
+    def _liberar_orfa(self, nome, inicio):
+        with self._lock:
+            self._orfas -= 1
+        metricas.observar("etapa_orfa", nome, time.perf_counter() - inicio)
+
+    def submeter(self, funcao, *args, **kwargs):
+        tarefa = Tarefa(self)
+        self.tarefas.submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        inicio = time.perf_counter()
+        status = "ok"
+        try:
+            funcao(tarefa, *args, **kwargs)
+            tarefa.emitir("fim")
+        except TarefaCancelada:
+            status = "cancelada"
+            tarefa.emitir("cancelada")
+        except Exception as e:
+            status = "erro"
+            tarefa.emitir("erro", e)
+        finally:
+            metricas.observar("tarefa", getattr(funcao, "__name__", "tarefa"), time.perf_counter() - inicio, status)
+
+    def drenar(self, tratar, limite=100):
+        for _ in range(limite):
+            try:
+                tarefa, tipo, dados = self.fila.get_nowait()
+            except queue.Empty:
+                return
+            tratar(tarefa, tipo, dados)
+
+    def encerrar(self):
+        self.tarefas.shutdown(wait=False, cancel_futures=True)
+        self.etapas.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,83 @@
+CANAL_PENDENCIAS = "pendencia_fila"
+
+
+def enfileirar_pendencia(cursor, pergunta, categoria_id, subcategoria_id, usuario_id):
+    cursor.execute(
+        """
+        INSERT INTO bloqueio_v2.pendencia_fila (pergunta, categoria_id, subcategoria_id, usuario_id)
+        VALUES (%s, %s, %s, %s)
+        RETURNING fila_id
+        """,
+        (pergunta, categoria_id, subcategoria_id, usuario_id),
+    )
+    fila_id = cursor.fetchone()[0]
+    cursor.execute(f"NOTIFY {CANAL_PENDENCIAS}")
+    return fila_id
+
+
+def reservar_lote(cursor, limite):
+    cursor.execute(
+        """
+        UPDATE bloqueio_v2.pendencia_fila SET status = 'processando'
+        WHERE fila_id IN (
+            SELECT fila_id FROM bloqueio_v2.pendencia_fila
+            WHERE status = 'nova' AND proxima_tentativa <= now()
+            ORDER BY fila_id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING fila_id, pergunta, categoria_id, subcategoria_id, usuario_id
+        """,
+        (limite,),
+    )
+    return sorted(cursor.fetchall())
+
+
+def concluir(cursor, fila_ids, status, erro=None):
+    if not fila_ids:
+        return
+    cursor.execute(
+        """
+        UPDATE bloqueio_v2.pendencia_fila
+        SET status = %s, processado_em = now(), erro = %s
+        WHERE fila_id = ANY(%s)
+        """,
+        (status, erro, list(fila_ids)),
+    )
+
+
+def reagendar(cursor, fila_ids, erro, max_tentativas, espera, espera_maxima):
+    if not fila_ids:
+        return []
+    cursor.execute(
+        """
+        UPDATE bloqueio_v2.pendencia_fila
+        SET tentativas = tentativas + 1,
+            erro = %s,
+            status = CASE WHEN tentativas + 1 >= %s THEN 'erro' ELSE 'nova' END,
+            processado_em = CASE WHEN tentativas + 1 >= %s THEN now() END,
+            proxima_tentativa = now() + make_interval(secs => least(%s * power(2, tentativas), %s))
+        WHERE fila_id = ANY(%s)
+        RETURNING fila_id, status, tentativas
+        """,
+        (erro, max_tentativas, max_tentativas, espera, espera_maxima, list(fila_ids)),
+    )
+    return cursor.fetchall()
+
+
+def perguntas_recentes(cursor, dias):
+    cursor.execute(
+        """
+        SELECT pergunta FROM bloqueio_v2.pendencia_fila
+        WHERE status = 'salva' AND processado_em >= now() - make_interval(days => %s)
+        """,
+        (dias,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def reabrir_interrompidas(cursor):
+    cursor.execute(
+        "UPDATE bloqueio_v2.pendencia_fila SET status = 'nova' WHERE status = 'processando'"
+    )
+    return cursor.rowcount
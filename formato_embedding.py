@@ -0,0 +1,29 @@
+import json
+import os
+
+import numpy as np
+import psycopg2
+
+EMBEDDING_FORMATO = os.environ.get("EMBEDDING_FORMATO", "json")
+FORMATOS = ("json", "float32", "pgvector")
+
+TIPOS_COLUNA = {"json": "text", "float32": "bytea", "pgvector": "vector"}
+
+
+def serializar_embedding(vetor, formato=None):
+    formato = formato or EMBEDDING_FORMATO
+    if formato == "float32":
+        return psycopg2.Binary(np.asarray(vetor, dtype="<f4").tobytes())
+    if formato == "pgvector":
+        return "[" + ",".join(repr(float(x)) for x in vetor) + "]"
+    if formato == "json":
+        return json.dumps([float(x) for x in vetor])
+    raise ValueError(f"Formato de embedding desconhecido: {formato}")
+
+
+def desserializar_embedding(valor):
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return np.frombuffer(valor, dtype="<f4")
+    if isinstance(valor, str):
+        return np.asarray(json.loads(valor), dtype=np.float32)
+    return np.asarray(valor, dtype=np.float32)
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from db import executar_preparada
+from formato_embedding import desserializar_embedding
+from metricas import metricas
+from recuperacao import IndiceLexico
+
+INDICE_VERIFICACAO_SEGUNDOS = float(os.environ.get("INDICE_VERIFICACAO_SEGUNDOS", "10"))
+PREFILTRO_DOCUMENTOS = int(os.environ.get("PREFILTRO_DOCUMENTOS", "0"))
+
+SQL_ASSINATURA = """
+    SELECT COUNT(*), md5(COALESCE(string_agg(d.documento_id || ':' || d.versao, ',' ORDER BY d.documento_id), ''))
+    FROM bloqueio_v2.documento d
+    WHERE d.subcategoria_id = %s
+"""
+
+SQL_PARAGRAFOS = """
+    SELECT d.documento_id, d.titulo, d.url_arquivo, e.paragrafo, e.embedding
+    FROM bloqueio_v2.documento_paragrafo_embedding e
+    JOIN bloqueio_v2.documento d ON d.documento_id = e.documento_id
+    WHERE d.subcategoria_id = %s
+    ORDER BY d.documento_id, e.ordem NULLS LAST
+"""
+
+SQL_DOCUMENTOS = """
+    SELECT de.documento_id, de.embedding
+    FROM bloqueio_v2.documento_embedding de
+    JOIN bloqueio_v2.documento d ON d.documento_id = de.documento_id
+    WHERE d.subcategoria_id = %s
+"""
+
+
+def normalizar_linhas(matriz):
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def top_k(scores, k):
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    k = min(k, len(scores))
+    if k < len(scores):
+        candidatos = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidatos = np.arange(len(scores))
+    return candidatos[np.argsort(-scores[candidatos], kind="stable")]
+
+
+class IndiceSubcategoria:
+    def __init__(self, assinatura, documento_ids, titulos, urls, paragrafos, matriz, faixas, matriz_documentos, sem_vetor):
+        self.assinatura = assinatura
+        self.documento_ids = documento_ids
+        self.titulos = titulos
+        self.urls = urls
+        self.paragrafos = paragrafos
+        self.matriz = matriz
+        self.verificado_em = time.monotonic()
+        self._lexico = None
+        self.faixas = faixas
+        self.matriz_documentos = matriz_documentos
+        self.sem_vetor = sem_vetor
+
+    def __len__(self):
+        return len(self.paragrafos)
+
+    def faixas_prefiltradas(self, consulta, prefiltro):
+        escolhidos = top_k(self.matriz_documentos @ consulta, prefiltro)
+        return [self.faixas[i] for i in escolhidos]
+
+    def linhas_prefiltradas(self, consulta, prefiltro):
+        faixas = self.faixas_prefiltradas(consulta, prefiltro)
+        return np.concatenate([np.arange(inicio, fim) for inicio, fim in faixas] + [self.sem_vetor])
+
+    def buscar(self, vetor, k=1, prefiltro=PREFILTRO_DOCUMENTOS):
+        if len(self) == 0:
+            return []
+        consulta = np.asarray(vetor, dtype=np.float32)
+        norma = np.linalg.norm(consulta)
+        if norma == 0:
+            return []
+        consulta = consulta / norma
+        if prefiltro and len(self.faixas) > prefiltro:
+            linhas = self.linhas_prefiltradas(consulta, prefiltro)
+            scores = self.matriz[linhas] @ consulta
+            ordem = top_k(scores, k)
+            indices, scores = linhas[ordem], scores[ordem]
+        else:
+            scores = self.matriz @ consulta
+            indices = top_k(scores, k)
+            scores = scores[indices]
+        return [
+            {
+                "documento_id": self.documento_ids[i],
+                "titulo": self.titulos[i],
+                "url": self.urls[i],
+                "paragrafo": self.paragrafos[i],
+                "score": float(score),
+            }
+            for i, score in zip(indices, scores)
+        ]
+
+    def lexico(self):
+        if self._lexico is None:
+            self._lexico = IndiceLexico(self.documento_ids, self.titulos, self.urls, self.paragrafos)
+        return self._lexico
+
+
+def montar_faixas(documento_ids, matriz, documentos):
+    inicios = {}
+    for i, documento_id in enumerate(documento_ids):
+        inicios.setdefault(documento_id, [i, i])[1] = i + 1
+
+    faixas, vetores, sem_vetor = [], [], []
+    for documento_id, (inicio, fim) in inicios.items():
+        vetor = documentos.get(documento_id)
+        if vetor is None or len(vetor) != matriz.shape[1]:
+            sem_vetor.append(np.arange(inicio, fim))
+            continue
+        faixas.append((inicio, fim))
+        vetores.append(vetor)
+
+    matriz_documentos = normalizar_linhas(np.vstack(vetores)) if vetores else np.empty((0, matriz.shape[1]), dtype=np.float32)
+    sem_vetor = np.concatenate(sem_vetor) if sem_vetor else np.empty(0, dtype=np.int64)
+    return faixas, matriz_documentos, sem_vetor
+
+
+def carregar_documentos(linhas):
+    documentos = {}
+    for documento_id, emb_db in linhas:
+        try:
+            documentos[documento_id] = np.asarray(desserializar_embedding(emb_db), dtype=np.float32)
+        except Exception as parse_err:
+            print(f"Erro ao processar embedding do documento {documento_id}: {parse_err}")
+    return documentos
+
+
+def montar_indice(assinatura, linhas, documentos=None):
+    documento_ids, titulos, urls, paragrafos, vetores = [], [], [], [], []
+    for documento_id, titulo, url, paragrafo, emb_db in linhas:
+        try:
+            vetores.append(desserializar_embedding(emb_db))
+        except Exception as parse_err:
+            print(f"Erro ao processar embedding do parágrafo: {parse_err}")
+            continue
+        documento_ids.append(documento_id)
+        titulos.append(titulo)
+        urls.append(url)
+        paragrafos.append(paragrafo)
+
+    if vetores:
+        matriz = normalizar_linhas(np.vstack(vetores))
+    else:
+        matriz = np.empty((0, 0), dtype=np.float32)
+    return IndiceSubcategoria(
+        assinatura, documento_ids, titulos, urls, paragrafos, matriz,
+        *montar_faixas(documento_ids, matriz, documentos or {})
+    )
+
+
+class IndiceEmbeddings:
+    def __init__(self, intervalo_verificacao=INDICE_VERIFICACAO_SEGUNDOS, snapshot=None):
+        self.intervalo_verificacao = intervalo_verificacao
+        self.snapshot = snapshot
+        self._indices = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_subcategoria(self, subcategoria_id):
+        with self._lock:
+            return self._locks.setdefault(subcategoria_id, threading.Lock())
+
+    def obter(self, cursor, subcategoria_id):
+        with self._lock_subcategoria(subcategoria_id):
+            indice = self._indices.get(subcategoria_id)
+            if indice and time.monotonic() - indice.verificado_em < self.intervalo_verificacao:
+                return indice
+
+            executar_preparada(cursor, "indice_assinatura", SQL_ASSINATURA, (subcategoria_id,))
+            assinatura = tuple(cursor.fetchone())
+            if indice and indice.assinatura == assinatura:
+                indice.verificado_em = time.monotonic()
+                return indice
+
+            indice = self.snapshot.carregar_indice(subcategoria_id, assinatura) if self.snapshot else None
+            if indice is None:
+                with metricas.medir("indice", "carga"):
+                    executar_preparada(cursor, "indice_documentos", SQL_DOCUMENTOS, (subcategoria_id,))
+                    documentos = carregar_documentos(cursor.fetchall())
+                    executar_preparada(cursor, "indice_paragrafos", SQL_PARAGRAFOS, (subcategoria_id,))
+                    indice = montar_indice(assinatura, cursor.fetchall(), documentos)
+                metricas.contar("indice_paragrafos_carregados", str(subcategoria_id), len(indice))
+                if self.snapshot:
+                    self.snapshot.salvar_indice(subcategoria_id, indice)
+            self._indices[subcategoria_id] = indice
+            return indice
+
+    def buscar(self, cursor, subcategoria_id, vetor, k=1, prefiltro=PREFILTRO_DOCUMENTOS):
+        return self.obter(cursor, subcategoria_id).buscar(vetor, k, prefiltro)
+
+    def lexico(self, cursor, subcategoria_id):
+        return self.obter(cursor, subcategoria_id).lexico()
+
+    def versao(self, cursor, subcategoria_id):
+        return str(self.obter(cursor, subcategoria_id).assinatura)
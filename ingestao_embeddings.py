@@ -0,0 +1,141 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+from psycopg2.extras import execute_values
+
+from cache_embeddings import obter_cache
+from formato_embedding import serializar_embedding
+from metricas import metricas
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+EMBEDDING_MODELO = os.environ.get("EMBEDDING_MODELO", "text-embedding-ada-002")
+EMBEDDING_LOTE_TOKENS = int(os.environ.get("EMBEDDING_LOTE_TOKENS", "50000"))
+EMBEDDING_LOTE_ITENS = int(os.environ.get("EMBEDDING_LOTE_ITENS", "256"))
+EMBEDDING_WORKERS = int(os.environ.get("EMBEDDING_WORKERS", "4"))
+EMBEDDING_TENTATIVAS = int(os.environ.get("EMBEDDING_TENTATIVAS", "6"))
+
+ERROS_TRANSITORIOS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.APIError,
+    openai.error.Timeout,
+)
+
+_codificador = None
+
+
+def estimar_tokens(texto):
+    global _codificador
+    if tiktoken is None:
+        return max(1, len(texto) // 4)
+    if _codificador is None:
+        _codificador = tiktoken.get_encoding("cl100k_base")
+    return len(_codificador.encode(texto))
+
+
+def agrupar_em_lotes(textos, max_tokens=EMBEDDING_LOTE_TOKENS, max_itens=EMBEDDING_LOTE_ITENS):
+    lotes, atual, tokens_atual = [], [], 0
+    for indice, texto in enumerate(textos):
+        tokens = estimar_tokens(texto)
+        if atual and (tokens_atual + tokens > max_tokens or len(atual) >= max_itens):
+            lotes.append(atual)
+            atual, tokens_atual = [], 0
+        atual.append(indice)
+        tokens_atual += tokens
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+def espera_para_tentativa(erro, tentativa):
+    headers = getattr(erro, "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(60.0, 2 ** tentativa) * (0.5 + random.random() / 2)
+
+
+def aguardar_tentativa(espera, cancelada=None):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if cancelada and cancelada():
+            return False
+        time.sleep(min(0.1, max(0.0, limite - time.monotonic())))
+    return True
+
+
+def criar_embeddings_com_retry(textos, modelo=EMBEDDING_MODELO, tentativas=EMBEDDING_TENTATIVAS, cancelada=None):
+    for tentativa in range(tentativas):
+        try:
+            with metricas.medir("api", "embeddings"):
+                resp = openai.Embedding.create(input=textos, model=modelo)
+            dados = sorted(resp["data"], key=lambda item: item["index"])
+            return [item["embedding"] for item in dados]
+        except ERROS_TRANSITORIOS as e:
+            if tentativa == tentativas - 1 or (cancelada and cancelada()):
+                raise
+            metricas.contar("api_retentativas", "embeddings")
+            espera = espera_para_tentativa(e, tentativa)
+            print(f"Falha transitória ao gerar embeddings ({e}); nova tentativa em {espera:.1f}s.")
+            if not aguardar_tentativa(espera, cancelada):
+                raise
+
+
+def gerar_embeddings(textos, modelo=EMBEDDING_MODELO, workers=EMBEDDING_WORKERS, usar_cache=True, cancelada=None):
+    textos = list(textos)
+    if not textos:
+        return []
+    embeddings = [None] * len(textos)
+    cache = obter_cache() if usar_cache else None
+    if cache:
+        for i, embedding in cache.obter_varios(modelo, textos).items():
+            embeddings[i] = embedding
+
+    pendentes = list(dict.fromkeys(t for t, e in zip(textos, embeddings) if e is None))
+    if pendentes:
+        novos = [None] * len(pendentes)
+        lotes = agrupar_em_lotes(pendentes)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(lotes)))) as executor:
+            futuros = {
+                executor.submit(criar_embeddings_com_retry, [pendentes[i] for i in lote], modelo, cancelada=cancelada): lote
+                for lote in lotes
+            }
+            for futuro, lote in futuros.items():
+                for i, embedding in zip(lote, futuro.result()):
+                    novos[i] = embedding
+        if cache:
+            cache.salvar_varios(modelo, pendentes, novos)
+        por_texto = dict(zip(pendentes, novos))
+        embeddings = [e if e is not None else por_texto[t] for t, e in zip(textos, embeddings)]
+    return embeddings
+
+
+def gerar_embedding(texto, modelo=EMBEDDING_MODELO):
+    return gerar_embeddings([texto], modelo)[0]
+
+
+def inserir_paragrafos(cursor, documento_id, paragrafos, embeddings, hashes, ordens):
+    execute_values(
+        cursor,
+        """
+        INSERT INTO bloqueio_v2.documento_paragrafo_embedding
+            (documento_id, paragrafo, embedding, hash_conteudo, ordem)
+        VALUES %s
+        """,
+        [
+            (documento_id, par, serializar_embedding(emb), h, ordem)
+            for par, emb, h, ordem in zip(paragrafos, embeddings, hashes, ordens)
+        ],
+        page_size=500,
+    )
@@ -0,0 +1,263 @@
+import csv
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urlparse
+
+import openai
+
+from db import conectar
+from formato_embedding import serializar_embedding
+from ingestao_embeddings import gerar_embedding
+from chunker import obter_chunker
+from sincronizacao import (
+    abrir_docx,
+    baixar_documento,
+    hash_documento,
+    invalidar_respostas,
+    registrar_versao,
+    sincronizar_paragrafos,
+    textos_docx,
+)
+
+openai.api_key = os.environ.get("OPENAI_API_KEY", "")
+
+INGESTAO_WORKERS = int(os.environ.get("INGESTAO_WORKERS", "4"))
+INGESTAO_TIPO = os.environ.get("INGESTAO_TIPO", "Texto")
+
+Fonte = namedtuple("Fonte", ["origem", "url_arquivo", "titulo", "subcategoria_id"])
+Carregado = namedtuple(
+    "Carregado", ["fonte", "paragrafos", "texto", "etag", "ultima_modificacao", "tamanho", "hash_conteudo"]
+)
+
+
+def titulo_de(caminho):
+    return os.path.splitext(os.path.basename(caminho))[0] or caminho
+
+
+def ler_manifesto(caminho, subcategoria_id):
+    fontes = []
+    with open(caminho, encoding="utf-8", newline="") as f:
+        for numero, linha in enumerate(csv.reader(f, delimiter=";"), 1):
+            if not linha or not linha[0].strip() or linha[0].lstrip().startswith("#"):
+                continue
+            url = linha[0].strip()
+            titulo = linha[1].strip() if len(linha) > 1 and linha[1].strip() else titulo_de(urlparse(url).path)
+            try:
+                sid = int(linha[2]) if len(linha) > 2 and linha[2].strip() else subcategoria_id
+            except ValueError:
+                print(f"Linha {numero} do manifesto ignorada: subcategoria_id inválido ({';'.join(linha)})")
+                continue
+            fontes.append(Fonte(url, url, titulo, sid))
+    return fontes
+
+
+def listar_diretorio(diretorio, subcategoria_id):
+    return [
+        Fonte(str(caminho), caminho.resolve().as_uri(), titulo_de(caminho.name), subcategoria_id)
+        for caminho in sorted(Path(diretorio).rglob("*.docx"))
+        if not caminho.name.startswith("~$")
+    ]
+
+
+def documentos_conhecidos(cursor, fontes):
+    cursor.execute(
+        """
+        SELECT DISTINCT ON (url_arquivo) url_arquivo, documento_id, etag, ultima_modificacao, hash_conteudo
+        FROM bloqueio_v2.documento
+        WHERE url_arquivo = ANY(%s)
+        ORDER BY url_arquivo, documento_id
+        """,
+        ([fonte.url_arquivo for fonte in fontes],),
+    )
+    return {url: tuple(resto) for url, *resto in cursor.fetchall()}
+
+
+def hashes_conhecidos(cursor, fontes):
+    cursor.execute(
+        """
+        SELECT DISTINCT ON (subcategoria_id, hash_conteudo) subcategoria_id, hash_conteudo, documento_id
+        FROM bloqueio_v2.documento
+        WHERE subcategoria_id = ANY(%s) AND hash_conteudo IS NOT NULL
+        ORDER BY subcategoria_id, hash_conteudo, documento_id
+        """,
+        (sorted({fonte.subcategoria_id for fonte in fontes}),),
+    )
+    return {(subcategoria_id, h): documento_id for subcategoria_id, h, documento_id in cursor.fetchall()}
+
+
+def carregar_fonte(fonte, conhecido):
+    _, etag, ultima_modificacao, hash_salvo = conhecido or (None, None, None, None)
+    if fonte.url_arquivo.startswith("file:"):
+        with open(fonte.origem, "rb") as f:
+            conteudo = f.read()
+        hash_arquivo = hash_documento(conteudo)
+        if hash_arquivo in (etag, hash_salvo):
+            return None
+        etag, ultima_modificacao = hash_arquivo, None
+    else:
+        baixado = baixar_documento(fonte.origem, etag, ultima_modificacao)
+        if baixado is None:
+            return None
+        conteudo, etag, ultima_modificacao = baixado
+        if hash_salvo and hash_documento(conteudo) == hash_salvo:
+            return None
+    doc = abrir_docx(conteudo)
+    texto = "\n".join(textos_docx(doc))
+    return Carregado(
+        fonte, obter_chunker().dividir(doc), texto, etag, ultima_modificacao, len(conteudo), hash_documento(conteudo)
+    )
+
+
+def carregar_em_janela(executor, fontes, conhecidos, janela):
+    restantes = iter(fontes)
+    pendentes = {}
+
+    def submeter():
+        fonte = next(restantes, None)
+        if fonte is not None:
+            pendentes[executor.submit(carregar_fonte, fonte, conhecidos.get(fonte.url_arquivo))] = fonte
+
+    for _ in range(janela):
+        submeter()
+    while pendentes:
+        concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in concluidos:
+            yield pendentes.pop(futuro), futuro
+            submeter()
+
+
+def gravar_documento(conn, carregado, documento_id):
+    fonte = carregado.fonte
+    with conn.cursor() as cursor:
+        novo = documento_id is None
+        if novo:
+            cursor.execute(
+                """
+                INSERT INTO bloqueio_v2.documento (titulo, tipo, url_arquivo, data_inclusao, subcategoria_id)
+                VALUES (%s, %s, %s, CURRENT_DATE, %s)
+                RETURNING documento_id
+                """,
+                (fonte.titulo, INGESTAO_TIPO, fonte.url_arquivo, fonte.subcategoria_id),
+            )
+            documento_id = cursor.fetchone()[0]
+
+        diferencas, alterado = sincronizar_paragrafos(cursor, documento_id, carregado.paragrafos)
+        if novo or alterado:
+            vetor = gerar_embedding(carregado.texto)
+            cursor.execute(
+                "DELETE FROM bloqueio_v2.documento_embedding WHERE documento_id = %s", (documento_id,)
+            )
+            cursor.execute(
+                """
+                INSERT INTO bloqueio_v2.documento_embedding (documento_id, texto_concatenado, embedding)
+                VALUES (%s, %s, %s)
+                """,
+                (documento_id, carregado.texto, serializar_embedding(vetor)),
+            )
+        registrar_versao(
+            cursor, documento_id, carregado.etag, carregado.ultima_modificacao, alterado, carregado.hash_conteudo
+        )
+    conn.commit()
+    return documento_id, diferencas, novo or alterado
+
+
+def ingerir(conn, fontes, workers=INGESTAO_WORKERS, forcar=False):
+    with conn.cursor() as cursor:
+        conhecidos = documentos_conhecidos(cursor, fontes)
+        por_hash = hashes_conhecidos(cursor, fontes)
+    conn.commit()
+    if forcar:
+        conhecidos = {url: (documento_id, None, None, None) for url, (documento_id, *_) in conhecidos.items()}
+
+    inicio = time.perf_counter()
+    total = len(fontes)
+    processados = inalterados = paragrafos_novos = bytes_lidos = 0
+    falhas = []
+    alteradas = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, (fonte, futuro) in enumerate(carregar_em_janela(executor, fontes, conhecidos, workers * 2), 1):
+            try:
+                carregado = futuro.result()
+                conhecido = conhecidos.get(fonte.url_arquivo)
+                duplicado = None
+                if carregado is not None and not conhecido:
+                    duplicado = por_hash.get((fonte.subcategoria_id, carregado.hash_conteudo))
+                if carregado is None:
+                    inalterados += 1
+                    situacao = "inalterado"
+                elif duplicado is not None:
+                    inalterados += 1
+                    situacao = f"mesmo conteúdo do documento {duplicado}; ignorado"
+                else:
+                    documento_id, diferencas, alterado = gravar_documento(
+                        conn, carregado, conhecido[0] if conhecido else None
+                    )
+                    if alterado:
+                        alteradas.add(fonte.subcategoria_id)
+                    conhecidos[fonte.url_arquivo] = (
+                        documento_id, carregado.etag, carregado.ultima_modificacao, carregado.hash_conteudo
+                    )
+                    por_hash[(fonte.subcategoria_id, carregado.hash_conteudo)] = documento_id
+                    processados += 1
+                    paragrafos_novos += len(diferencas.novos)
+                    bytes_lidos += carregado.tamanho
+                    situacao = (
+                        f"documento {documento_id}: +{len(diferencas.novos)} "
+                        f"-{len(diferencas.removidos)} ~{len(diferencas.reordenados)}"
+                    )
+            except Exception as e:
+                conn.rollback()
+                falhas.append((fonte, e))
+                situacao = f"ERRO: {e}"
+            decorrido = max(time.perf_counter() - inicio, 1e-9)
+            print(
+                f"[{i}/{total}] {fonte.titulo} — {situacao} "
+                f"({i / decorrido:.2f} doc/s, {paragrafos_novos / decorrido:.1f} parágrafos/s)"
+            )
+
+    invalidar_respostas(alteradas)
+    decorrido = time.perf_counter() - inicio
+    print(
+        f"\nIngestão concluída em {decorrido:.1f}s: {processados} gravado(s), {inalterados} inalterado(s), "
+        f"{len(falhas)} falha(s), {paragrafos_novos} parágrafo(s) novo(s), {bytes_lidos / 1e6:.1f} MB lidos."
+    )
+    for fonte, erro in falhas:
+        print(f"  falhou: {fonte.origem} ({erro})")
+    return falhas
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Uso: python ingestao_lote.py <manifesto.csv|diretorio> <subcategoria_id> [--forcar]")
+        print("  manifesto: uma linha por documento, 'url;titulo;subcategoria_id' (titulo e subcategoria opcionais)")
+        sys.exit(1)
+
+    if not openai.api_key:
+        print("OPENAI_API_KEY não definida. Abortando.")
+        sys.exit(1)
+
+    origem, subcategoria_id = sys.argv[1], int(sys.argv[2])
+    if os.path.isdir(origem):
+        fontes = listar_diretorio(origem, subcategoria_id)
+    else:
+        fontes = ler_manifesto(origem, subcategoria_id)
+    if not fontes:
+        print("Nenhum documento encontrado.")
+        sys.exit(0)
+
+    conn = None
+    try:
+        conn = conectar()
+        falhas = ingerir(conn, fontes, forcar="--forcar" in sys.argv)
+    except Exception as e:
+        print(f"Erro na ingestão: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+    sys.exit(1 if falhas else 0)
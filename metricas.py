@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICAS_LOG = os.environ.get("METRICAS_LOG", "0") == "1"
+METRICAS_HOST = os.environ.get("METRICAS_HOST", "127.0.0.1")
+METRICAS_PORTA = int(os.environ.get("METRICAS_PORTA", "0"))
+METRICAS_AMOSTRAS = int(os.environ.get("METRICAS_AMOSTRAS", "10000"))
+METRICAS_PREFIXO = "bot"
+
+LIMITES_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_SEGUNDOS, amostras=METRICAS_AMOSTRAS):
+        self.limites = limites
+        self.baldes = [0] * len(limites)
+        self.total = 0
+        self.soma = 0.0
+        self.amostras = deque(maxlen=amostras)
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.baldes[i] += 1
+        self.total += 1
+        self.soma += valor
+        self.amostras.append(valor)
+
+    def percentis(self, *ps):
+        if not self.amostras:
+            return [0.0] * len(ps)
+        return [float(v) for v in np.percentile(np.fromiter(self.amostras, dtype=np.float64), ps)]
+
+
+def escapar_rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def rotulos_prometheus(rotulos):
+    return ",".join(f'{chave}="{escapar_rotulo(valor)}"' for chave, valor in rotulos)
+
+
+class Metricas:
+    def __init__(self, log=METRICAS_LOG):
+        self.log = log
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._contadores = {}
+
+    def observar(self, familia, nome, duracao, status="ok"):
+        with self._lock:
+            chave = (familia, nome)
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma()
+            histograma.observar(duracao)
+            if status != "ok":
+                contador = (f"{familia}_{status}", nome)
+                self._contadores[contador] = self._contadores.get(contador, 0) + 1
+        if self.log:
+            print(json.dumps({
+                "ts": round(time.time(), 3),
+                "familia": familia,
+                "nome": nome,
+                "duracao_ms": round(duracao * 1000, 3),
+                "status": status,
+                "thread": threading.current_thread().name,
+            }, ensure_ascii=False))
+
+    def contar(self, familia, nome, quantidade=1):
+        with self._lock:
+            self._contadores[(familia, nome)] = self._contadores.get((familia, nome), 0) + quantidade
+
+    @contextmanager
+    def medir(self, familia, nome):
+        inicio = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "erro"
+            raise
+        finally:
+            self.observar(familia, nome, time.perf_counter() - inicio, status)
+
+    def percentis(self, familia, nome, *ps):
+        with self._lock:
+            histograma = self._histogramas.get((familia, nome))
+            return histograma.percentis(*ps) if histograma else [0.0] * len(ps)
+
+    def resumo(self, familia=None):
+        with self._lock:
+            itens = [(chave, h) for chave, h in self._histogramas.items() if familia is None or chave[0] == familia]
+            return {
+                chave: {
+                    "total": h.total,
+                    "media_ms": h.soma / h.total * 1000 if h.total else 0.0,
+                    "p50_ms": p50 * 1000,
+                    "p95_ms": p95 * 1000,
+                    "p99_ms": p99 * 1000,
+                }
+                for chave, h in itens
+                for p50, p95, p99 in [h.percentis(50, 95, 99)]
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+
+    def exportar_prometheus(self):
+        linhas = []
+        with self._lock:
+            familias = sorted({familia for familia, _ in self._histogramas})
+            for familia in familias:
+                metrica = f"{METRICAS_PREFIXO}_{familia}_segundos"
+                linhas.append(f"# TYPE {metrica} histogram")
+                for (f, nome), h in sorted(self._histogramas.items()):
+                    if f != familia:
+                        continue
+                    for limite, quantidade in zip(h.limites, h.baldes):
+                        linhas.append(f"{metrica}_bucket{{{rotulos_prometheus([('nome', nome), ('le', limite)])}}} {quantidade}")
+                    linhas.append(f"{metrica}_bucket{{{rotulos_prometheus([('nome', nome), ('le', '+Inf')])}}} {h.total}")
+                    linhas.append(f"{metrica}_sum{{{rotulos_prometheus([('nome', nome)])}}} {h.soma}")
+                    linhas.append(f"{metrica}_count{{{rotulos_prometheus([('nome', nome)])}}} {h.total}")
+            familias = sorted({familia for familia, _ in self._contadores})
+            for familia in familias:
+                metrica = f"{METRICAS_PREFIXO}_{familia}_total"
+                linhas.append(f"# TYPE {metrica} counter")
+                for (f, nome), valor in sorted(self._contadores.items()):
+                    if f == familia:
+                        linhas.append(f"{metrica}{{{rotulos_prometheus([('nome', nome)])}}} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+metricas = Metricas()
+
+
+class MetricasHandler(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        dados = metricas.exportar_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+def iniciar_servidor_metricas(porta=METRICAS_PORTA, host=METRICAS_HOST):
+    if not porta:
+        return None
+    servidor = ThreadingHTTPServer((host, porta), MetricasHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True, name="metricas").start()
+    print(f"Métricas disponíveis em http://{host}:{porta}/metrics")
+    return servidor
@@ -0,0 +1,135 @@
+import os
+import sys
+from contextlib import closing
+
+from psycopg2.extras import execute_values
+
+from db import conectar
+from formato_embedding import FORMATOS, TIPOS_COLUNA, desserializar_embedding, serializar_embedding
+
+TABELAS = ("documento_paragrafo_embedding", "documento_embedding")
+EMBEDDING_DIMENSAO = int(os.environ.get("EMBEDDING_DIMENSAO", "1536"))
+
+
+def tipo_coluna(cursor, tabela, coluna="embedding"):
+    cursor.execute(
+        """
+        SELECT udt_name FROM information_schema.columns
+        WHERE table_schema = 'bloqueio_v2' AND table_name = %s AND column_name = %s
+        """,
+        (tabela, coluna),
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def dimensao_coluna(cursor, tabela, coluna="embedding"):
+    cursor.execute(
+        """
+        SELECT a.atttypmod FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attname = %s AND NOT a.attisdropped
+        """,
+        (f"bloqueio_v2.{tabela}", coluna),
+    )
+    row = cursor.fetchone()
+    return row[0] if row and row[0] > 0 else None
+
+
+def dimensionar_vector(cursor, tabela, dimensao):
+    cursor.execute(f"SELECT vector_dims(embedding) FROM bloqueio_v2.{tabela} WHERE embedding IS NOT NULL LIMIT 1")
+    row = cursor.fetchone()
+    dimensao = row[0] if row else dimensao or EMBEDDING_DIMENSAO
+    cursor.execute(
+        f"ALTER TABLE bloqueio_v2.{tabela} ALTER COLUMN embedding TYPE vector({dimensao}) "
+        f"USING embedding::vector({dimensao})"
+    )
+    print(f"Tabela {tabela}: coluna vector sem dimensão fixada em vector({dimensao}).")
+
+
+def migrar_tabela(cursor, tabela, formato, dimensao=None):
+    atual = tipo_coluna(cursor, tabela)
+    if atual is None:
+        print(f"Tabela {tabela} sem coluna embedding. Ignorando.")
+        return
+    if atual == TIPOS_COLUNA[formato]:
+        if formato == "pgvector" and dimensao_coluna(cursor, tabela) is None:
+            dimensionar_vector(cursor, tabela, dimensao)
+        else:
+            print(f"Tabela {tabela} já está no formato {formato}.")
+        return
+
+    cursor.execute(f"SELECT ctid, embedding FROM bloqueio_v2.{tabela}")
+    linhas = cursor.fetchall()
+    if not linhas:
+        print(f"Tabela {tabela} vazia; apenas alterando o tipo da coluna.")
+
+    dimensao_dados = None
+    convertidos = []
+    for ctid, emb_db in linhas:
+        if emb_db is None:
+            continue
+        vetor = desserializar_embedding(emb_db)
+        dimensao_dados = dimensao_dados or len(vetor)
+        convertidos.append((ctid, serializar_embedding(vetor, formato)))
+    if dimensao and dimensao_dados and dimensao != dimensao_dados:
+        raise ValueError(f"Tabela {tabela} tem embeddings de dimensão {dimensao_dados}, não {dimensao}.")
+
+    tipo = TIPOS_COLUNA[formato]
+    if formato == "pgvector":
+        tipo = f"vector({dimensao_dados or dimensao or EMBEDDING_DIMENSAO})"
+
+    cursor.execute(f"ALTER TABLE bloqueio_v2.{tabela} ADD COLUMN embedding_novo {tipo}")
+    execute_values(
+        cursor,
+        f"""
+        UPDATE bloqueio_v2.{tabela} AS t SET embedding_novo = v.embedding::{tipo}
+        FROM (VALUES %s) AS v (linha, embedding)
+        WHERE t.ctid = v.linha::tid
+        """,
+        [(str(ctid), emb) for ctid, emb in convertidos],
+        page_size=500,
+    )
+    cursor.execute(f"ALTER TABLE bloqueio_v2.{tabela} DROP COLUMN embedding")
+    cursor.execute(f"ALTER TABLE bloqueio_v2.{tabela} RENAME COLUMN embedding_novo TO embedding")
+    print(f"Tabela {tabela}: {len(convertidos)} embeddings convertidos de {atual} para {tipo}.")
+
+
+def ler_dimensao(argumentos):
+    if "--dimensao" not in argumentos:
+        return None
+    posicao = argumentos.index("--dimensao") + 1
+    if posicao >= len(argumentos) or not argumentos[posicao].isdigit():
+        raise ValueError("Informe um número após --dimensao.")
+    return int(argumentos[posicao])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in FORMATOS:
+        print(f"Uso: python migrar_embeddings.py <{'|'.join(FORMATOS)}> [--dimensao N]")
+        print(f"  --dimensao: dimensão da coluna vector quando a tabela está vazia (padrão {EMBEDDING_DIMENSAO})")
+        sys.exit(1)
+
+    formato = sys.argv[1]
+    try:
+        dimensao = ler_dimensao(sys.argv[2:])
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    conn = None
+    try:
+        conn = conectar()
+        with closing(conn.cursor()) as cursor:
+            if formato == "pgvector":
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            for tabela in TABELAS:
+                migrar_tabela(cursor, tabela, formato, dimensao)
+        conn.commit()
+        print(f"Migração concluída. Defina EMBEDDING_FORMATO={formato} no ambiente.")
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Erro na migração: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
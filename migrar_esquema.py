@@ -0,0 +1,196 @@
+import sys
+from contextlib import closing
+
+from busca_textual import BUSCA_TEXTUAL_CONFIGURACAO
+from db import conectar
+
+SQL_ESQUEMA = """
+    ALTER TABLE bloqueio_v2.documento ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1;
+    ALTER TABLE bloqueio_v2.documento ADD COLUMN IF NOT EXISTS etag TEXT;
+    ALTER TABLE bloqueio_v2.documento ADD COLUMN IF NOT EXISTS ultima_modificacao TEXT;
+    ALTER TABLE bloqueio_v2.documento ADD COLUMN IF NOT EXISTS hash_conteudo TEXT;
+    UPDATE bloqueio_v2.documento SET hash_conteudo = etag
+    WHERE hash_conteudo IS NULL AND url_arquivo LIKE 'file:%' AND etag IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS documento_hash_conteudo_idx
+        ON bloqueio_v2.documento (subcategoria_id, hash_conteudo);
+    ALTER TABLE bloqueio_v2.documento_paragrafo_embedding ADD COLUMN IF NOT EXISTS hash_conteudo TEXT;
+    ALTER TABLE bloqueio_v2.documento_paragrafo_embedding ADD COLUMN IF NOT EXISTS ordem INTEGER;
+    UPDATE bloqueio_v2.documento_paragrafo_embedding SET hash_conteudo = md5(paragrafo) WHERE hash_conteudo IS NULL;
+    CREATE INDEX IF NOT EXISTS documento_paragrafo_hash_idx
+        ON bloqueio_v2.documento_paragrafo_embedding (documento_id, hash_conteudo);
+"""
+
+SQL_FILA_PENDENCIAS = """
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.pendencia_fila (
+        fila_id BIGSERIAL PRIMARY KEY,
+        pergunta TEXT NOT NULL,
+        categoria_id INTEGER,
+        subcategoria_id INTEGER,
+        usuario_id INTEGER,
+        status TEXT NOT NULL DEFAULT 'nova',
+        criado_em TIMESTAMPTZ NOT NULL DEFAULT now(),
+        processado_em TIMESTAMPTZ,
+        erro TEXT
+    );
+    ALTER TABLE bloqueio_v2.pendencia_fila ADD COLUMN IF NOT EXISTS tentativas INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE bloqueio_v2.pendencia_fila ADD COLUMN IF NOT EXISTS proxima_tentativa TIMESTAMPTZ NOT NULL DEFAULT now();
+    DROP INDEX IF EXISTS bloqueio_v2.pendencia_fila_nova_idx;
+    CREATE INDEX IF NOT EXISTS pendencia_fila_pronta_idx
+        ON bloqueio_v2.pendencia_fila (proxima_tentativa, fila_id) WHERE status = 'nova';
+"""
+
+SQL_INDICE_TEXTUAL = f"""
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS documento_paragrafo_tsv_idx
+        ON bloqueio_v2.documento_paragrafo_embedding
+        USING gin (to_tsvector('{BUSCA_TEXTUAL_CONFIGURACAO}', paragrafo))
+"""
+
+SQL_FUNCAO_VERSAO = """
+    CREATE OR REPLACE FUNCTION bloqueio_v2.incrementar_versao_documento() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' THEN
+            UPDATE bloqueio_v2.documento SET versao = versao + 1
+            WHERE documento_id IN (SELECT documento_id FROM alterados UNION SELECT documento_id FROM anteriores);
+        ELSE
+            UPDATE bloqueio_v2.documento SET versao = versao + 1
+            WHERE documento_id IN (SELECT documento_id FROM alterados);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+"""
+
+SQL_INDICES_UNICOS = """
+    CREATE UNIQUE INDEX IF NOT EXISTS categoria_nome_unico_idx
+        ON bloqueio_v2.categoria (lower(nome));
+    CREATE UNIQUE INDEX IF NOT EXISTS subcategoria_nome_unico_idx
+        ON bloqueio_v2.subcategoria (categoria_id, lower(nome));
+"""
+
+DUPLICADOS = {
+    "categoria": ("categoria_id", "lower(nome)"),
+    "subcategoria": ("subcategoria_id", "categoria_id, lower(nome)"),
+}
+REFERENCIAS = {
+    "categoria": (("subcategoria", "categoria_id"), ("assunto_pendente", "categoria_id"), ("pendencia_fila", "categoria_id")),
+    "subcategoria": (
+        ("documento", "subcategoria_id"),
+        ("assunto_pendente", "subcategoria_id"),
+        ("pendencia_fila", "subcategoria_id"),
+    ),
+}
+
+TABELAS_VERSIONADAS = ("documento_paragrafo_embedding", "documento_embedding")
+TRANSICOES = {
+    "INSERT": "NEW TABLE AS alterados",
+    "UPDATE": "NEW TABLE AS alterados OLD TABLE AS anteriores",
+    "DELETE": "OLD TABLE AS alterados",
+}
+
+
+def criar_gatilhos_versao(cursor):
+    cursor.execute(SQL_FUNCAO_VERSAO)
+    for tabela in TABELAS_VERSIONADAS:
+        for evento, transicao in TRANSICOES.items():
+            nome = f"{tabela}_versao_{evento.lower()}"
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nome} ON bloqueio_v2.{tabela}")
+            cursor.execute(
+                f"""
+                CREATE TRIGGER {nome} AFTER {evento} ON bloqueio_v2.{tabela}
+                REFERENCING {transicao}
+                FOR EACH STATEMENT EXECUTE FUNCTION bloqueio_v2.incrementar_versao_documento()
+                """
+            )
+
+
+def listar_duplicados(cursor, tabela):
+    chave, grupo = DUPLICADOS[tabela]
+    cursor.execute(
+        f"""
+        SELECT min(nome), array_agg({chave} ORDER BY {chave}) FROM bloqueio_v2.{tabela}
+        GROUP BY {grupo} HAVING count(*) > 1
+        """
+    )
+    return cursor.fetchall()
+
+
+def mesclar_duplicados(cursor, tabela):
+    chave, grupo = DUPLICADOS[tabela]
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE {tabela}_duplicada ON COMMIT DROP AS
+        SELECT id, manter FROM (
+            SELECT {chave} AS id, min({chave}) OVER (PARTITION BY {grupo}) AS manter FROM bloqueio_v2.{tabela}
+        ) t WHERE id <> manter
+        """
+    )
+    for referencia, coluna in REFERENCIAS[tabela]:
+        cursor.execute(
+            f"""
+            UPDATE bloqueio_v2.{referencia} r SET {coluna} = d.manter
+            FROM {tabela}_duplicada d WHERE r.{coluna} = d.id
+            """
+        )
+    cursor.execute(f"DELETE FROM bloqueio_v2.{tabela} t USING {tabela}_duplicada d WHERE t.{chave} = d.id")
+    cursor.execute(f"DROP TABLE {tabela}_duplicada")
+
+
+def criar_indices_unicos(cursor, mesclar=False):
+    for tabela in DUPLICADOS:
+        duplicados = listar_duplicados(cursor, tabela)
+        if not duplicados:
+            continue
+        for nome, ids in duplicados:
+            print(f"{tabela} duplicada '{nome}': ids {', '.join(map(str, ids))}")
+        if not mesclar:
+            raise RuntimeError(
+                f"{len(duplicados)} nome(s) de {tabela} duplicado(s); corrija-os ou rode com --mesclar-duplicados"
+            )
+        mesclar_duplicados(cursor, tabela)
+        print(f"{len(duplicados)} nome(s) de {tabela} mesclado(s) no menor id.")
+    cursor.execute(SQL_INDICES_UNICOS)
+
+
+def migrar_esquema(cursor, mesclar=False):
+    cursor.execute(SQL_ESQUEMA)
+    cursor.execute(SQL_FILA_PENDENCIAS)
+    criar_indices_unicos(cursor, mesclar)
+    criar_gatilhos_versao(cursor)
+
+
+def criar_indice_textual(conn):
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with closing(conn.cursor()) as cursor:
+            cursor.execute(
+                """
+                SELECT indisvalid FROM pg_index
+                WHERE indexrelid = to_regclass('bloqueio_v2.documento_paragrafo_tsv_idx')
+                """
+            )
+            row = cursor.fetchone()
+            if row and not row[0]:
+                cursor.execute("DROP INDEX CONCURRENTLY bloqueio_v2.documento_paragrafo_tsv_idx")
+            cursor.execute(SQL_INDICE_TEXTUAL)
+    finally:
+        conn.autocommit = autocommit
+
+
+if __name__ == "__main__":
+    conn = None
+    try:
+        conn = conectar()
+        with closing(conn.cursor()) as cursor:
+            migrar_esquema(cursor, "--mesclar-duplicados" in sys.argv[1:])
+        conn.commit()
+        criar_indice_textual(conn)
+        print("Esquema atualizado.")
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Erro na migração do esquema: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
@@ -0,0 +1,258 @@
+import os
+import time
+
+import openai
+
+from busca_pgvector import BuscaPgvector
+from busca_textual import BuscaTextual
+from cache_respostas import CacheRespostas, chave_resposta
+from db import listar_categorias, listar_todas_subcategorias
+from execucao import TarefaCancelada
+from fila_pendencias import enfileirar_pendencia
+from indice_embeddings import IndiceEmbeddings
+from ingestao_embeddings import gerar_embeddings
+from metricas import metricas
+from palavras_chave import MatcherPalavrasChave
+from recuperacao import (
+    BUSCA_HIBRIDA,
+    RECUPERACAO_CANDIDATOS,
+    RECUPERACAO_K,
+    RECUPERACAO_LIMIAR_CONTEXTO,
+    RERANK_BM25,
+    empacotar_contexto,
+    lexico_decisivo,
+    montar_contexto,
+    selecionar_hibridas,
+    selecionar_passagens,
+    urls_passagens,
+)
+
+openai.api_key = os.environ.get("OPENAI_API_KEY", "")
+
+BUSCA_BACKEND = os.environ.get("BUSCA_BACKEND", "local")
+BUSCA_LIMIAR = float(os.environ.get("BUSCA_LIMIAR", "0.85"))
+TIMEOUT_BANCO = float(os.environ.get("TIMEOUT_BANCO", "15"))
+TIMEOUT_EMBEDDING = float(os.environ.get("TIMEOUT_EMBEDDING", "20"))
+TIMEOUT_LLM = float(os.environ.get("TIMEOUT_LLM", "60"))
+RESPOSTA_STREAMING = os.environ.get("RESPOSTA_STREAMING", "1") == "1"
+USUARIO_ID = int(os.environ.get("USUARIO_ID", "999"))
+
+
+def gerar_resposta_humana(pergunta, passagens, ao_receber=None, cancelada=None):
+    prompt = (
+        f"Pergunta: {pergunta}\n\n"
+        f"Trechos relevantes dos documentos:\n\n{montar_contexto(passagens)}\n\n"
+        f"Responda de forma clara, empática e humanizada para ajudar o usuário, "
+        f"usando apenas as informações dos trechos acima:"
+    )
+    streaming = RESPOSTA_STREAMING and ao_receber is not None
+    inicio = time.perf_counter()
+    try:
+        chat_response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "Você é um atendente educado e prestativo de uma central de atendimento."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            request_timeout=TIMEOUT_LLM,
+            stream=streaming
+        )
+        if not streaming:
+            escolha = chat_response.choices[0]
+            resposta = escolha.message.content.strip()
+            if ao_receber:
+                ao_receber(resposta)
+            return resposta, escolha.get("finish_reason") == "stop"
+        trechos, fim = [], None
+        for chunk in chat_response:
+            if cancelada and cancelada():
+                chat_response.close()
+                return "".join(trechos).strip(), False
+            escolha = chunk.choices[0]
+            trecho = escolha.delta.get("content")
+            if trecho:
+                if not trechos:
+                    metricas.observar("api", "chat_primeiro_token", time.perf_counter() - inicio)
+                trechos.append(trecho)
+                ao_receber(trecho)
+            fim = escolha.get("finish_reason") or fim
+        return "".join(trechos).strip(), fim == "stop"
+    except Exception as e:
+        trecho = passagens[0]["paragrafo"] if passagens else ""
+        resposta = f"(Erro ao gerar resposta humanizada: {e})\n\n{trecho}"
+        if ao_receber:
+            ao_receber(resposta)
+        return resposta, False
+
+
+def formatar_links(urls):
+    return "\n".join(f"🔗 {url}" for url in urls.splitlines())
+
+
+class MotorBusca:
+    def __init__(self, banco, indice=None, cache_respostas=None, palavras_chave=None, busca_textual=None,
+                 limiar=BUSCA_LIMIAR, limiar_contexto=RECUPERACAO_LIMIAR_CONTEXTO, usar_cache=True, snapshot=None):
+        self.banco = banco
+        self.snapshot = snapshot
+        self.indice = indice or (BuscaPgvector() if BUSCA_BACKEND == "pgvector" else IndiceEmbeddings(snapshot=snapshot))
+        self.cache_respostas = cache_respostas or CacheRespostas()
+        self.palavras_chave = palavras_chave or MatcherPalavrasChave(snapshot=snapshot)
+        self.busca_textual = busca_textual or BuscaTextual()
+        self.limiar = limiar
+        self.limiar_contexto = limiar_contexto
+        self.usar_cache = usar_cache
+
+    def carregar_arvore(self):
+        arvore = {
+            "categorias": [list(linha) for linha in self.banco.com_cursor(listar_categorias)],
+            "subcategorias": [list(linha) for linha in self.banco.com_cursor(listar_todas_subcategorias)],
+        }
+        if self.snapshot:
+            self.snapshot.salvar_categorias(arvore)
+        return arvore
+
+    def aquecer(self, tarefa, subcategorias):
+        for subcategoria_id in subcategorias:
+            tarefa.verificar()
+            try:
+                with metricas.medir("aquecimento", str(subcategoria_id)):
+                    self.banco.com_cursor(self.indice.versao, subcategoria_id)
+                    self.banco.com_cursor(self.palavras_chave.obter, subcategoria_id)
+                    if RERANK_BM25:
+                        self.banco.com_cursor(self.indice.lexico, subcategoria_id)
+            except Exception as e:
+                print(f"Erro ao pré-carregar a subcategoria {subcategoria_id}: {e}")
+
+    def iniciar(self, tarefa):
+        arvore = tarefa.etapa("categorias", self.carregar_arvore, timeout=TIMEOUT_BANCO)
+        tarefa.emitir("arvore", arvore)
+        self.aquecer(tarefa, [subcategoria_id for _, subcategoria_id, _ in arvore["subcategorias"]])
+
+    def responder(self, tarefa, pergunta, passagens):
+        return tarefa.etapa(
+            "resposta", gerar_resposta_humana, pergunta, passagens,
+            ao_receber=lambda trecho: tarefa.emitir("texto", trecho),
+            cancelavel=True, timeout=TIMEOUT_LLM
+        )
+
+    def concluir(self, tarefa, origem, resposta, urls, score, **extras):
+        metricas.contar("busca", origem)
+        tarefa.emitir("resultado", {
+            "origem": origem,
+            "resposta": resposta,
+            "urls": urls.splitlines() if isinstance(urls, str) else list(urls),
+            "score": score,
+            **extras,
+        })
+
+    def salvar_cache(self, chave, subcategoria_id, resposta, urls, score, versao, embedding=None):
+        if self.usar_cache:
+            self.cache_respostas.salvar(chave, subcategoria_id, resposta, urls, score, versao, embedding)
+
+    def buscar(self, tarefa, pergunta, categoria_id, subcategoria_id, usuario_id=USUARIO_ID):
+        banco = self.banco
+        versao = tarefa.etapa("versão", banco.com_cursor, self.indice.versao, subcategoria_id, timeout=TIMEOUT_BANCO)
+        chave_cache = chave_resposta(subcategoria_id, pergunta)
+        resposta = self.cache_respostas.obter(chave_cache, versao) if self.usar_cache else None
+        if resposta:
+            tarefa.emitir("limpar")
+            tarefa.emitir("texto", f"{resposta['resposta']}\n\n{formatar_links(resposta['url'])}\n📈 Similaridade: {resposta['score']:.4f} (cache)")
+            self.concluir(tarefa, "cache", resposta["resposta"], resposta["url"], resposta["score"])
+            return
+
+        palavras_chave_resultados = tarefa.etapa(
+            "palavras-chave", banco.com_cursor, self.palavras_chave.encontrar, subcategoria_id, pergunta,
+            timeout=TIMEOUT_BANCO
+        )
+        palavras_encontradas = list(dict.fromkeys(palavra for _, _, _, palavra in palavras_chave_resultados))
+
+        if palavras_encontradas:
+            documentos = {doc_id for doc_id, _, _, _ in palavras_chave_resultados}
+            lexico = tarefa.etapa("índice léxico", banco.com_cursor, self.indice.lexico, subcategoria_id, timeout=TIMEOUT_BANCO)
+            passagens = empacotar_contexto(lexico.buscar(
+                pergunta, max(RECUPERACAO_K, len(documentos)), documentos=documentos,
+                por_documento=max(1, RECUPERACAO_K // len(documentos))
+            ))
+            tarefa.emitir("limpar")
+            tarefa.emitir("texto", f"🤖 Resposta baseada em palavras-chave:\n\nPalavras encontradas: {', '.join(palavras_encontradas)}\n\n")
+            resposta_humana, urls = "", ""
+            if passagens:
+                titulos = list(dict.fromkeys(p["titulo"] for p in passagens))
+                tarefa.emitir("texto", f"📄 Documentos: {', '.join(titulos)}\n")
+                resposta_humana, completa = self.responder(tarefa, pergunta, passagens)
+                urls = "\n".join(urls_passagens(passagens))
+                tarefa.emitir("texto", f"\n\n{formatar_links(urls)}")
+                if completa:
+                    self.salvar_cache(chave_cache, subcategoria_id, resposta_humana, urls, 1.0, versao)
+            self.concluir(tarefa, "palavras_chave", resposta_humana, urls, 1.0, palavras=palavras_encontradas)
+            return
+
+        textuais = []
+        if BUSCA_HIBRIDA:
+            textuais = tarefa.etapa(
+                "busca textual", banco.com_cursor, self.busca_textual.buscar, subcategoria_id, pergunta,
+                k=RECUPERACAO_CANDIDATOS, timeout=TIMEOUT_BANCO
+            )
+            if lexico_decisivo(textuais):
+                passagens = empacotar_contexto(textuais[:RECUPERACAO_K])
+                cobertura = textuais[0]["cobertura"]
+                tarefa.emitir("limpar")
+                resposta_humana, completa = self.responder(tarefa, pergunta, passagens)
+                urls = "\n".join(urls_passagens(passagens))
+                tarefa.emitir("texto", f"\n\n{formatar_links(urls)}\n📈 Cobertura textual: {cobertura:.4f}")
+                if completa:
+                    self.salvar_cache(chave_cache, subcategoria_id, resposta_humana, urls, cobertura, versao)
+                self.concluir(tarefa, "textual", resposta_humana, urls, cobertura)
+                return
+
+        emb_pergunta = tarefa.etapa(
+            "embedding", lambda cancelada: gerar_embeddings([pergunta], usar_cache=self.usar_cache, cancelada=cancelada)[0],
+            cancelavel=True, timeout=TIMEOUT_EMBEDDING
+        )
+
+        resposta = self.cache_respostas.buscar_semelhante(subcategoria_id, pergunta, emb_pergunta, versao) if self.usar_cache else None
+        if resposta:
+            tarefa.emitir("limpar")
+            tarefa.emitir("texto", f"{resposta['resposta']}\n\n{formatar_links(resposta['url'])}\n📈 Similaridade: {resposta['score']:.4f} (cache semântico, pergunta {resposta['similaridade_pergunta']:.4f})")
+            self.concluir(tarefa, "cache_semantico", resposta["resposta"], resposta["url"], resposta["score"])
+            return
+
+        candidatos = tarefa.etapa(
+            "busca semântica", banco.com_cursor, self.indice.buscar, subcategoria_id, emb_pergunta,
+            k=RECUPERACAO_CANDIDATOS, timeout=TIMEOUT_BANCO
+        )
+        melhor_score = max((c["score"] for c in candidatos), default=-1)
+
+        if melhor_score >= self.limiar:
+            if textuais:
+                passagens = selecionar_hibridas(candidatos, textuais, limiar=self.limiar_contexto)
+            else:
+                lexico = None
+                if RERANK_BM25:
+                    lexico = tarefa.etapa("índice léxico", banco.com_cursor, self.indice.lexico, subcategoria_id, timeout=TIMEOUT_BANCO)
+                passagens = selecionar_passagens(pergunta, candidatos, lexico, limiar=self.limiar_contexto)
+            tarefa.emitir("limpar")
+            resposta_humana, completa = self.responder(tarefa, pergunta, passagens)
+            urls = "\n".join(urls_passagens(passagens))
+            tarefa.emitir("texto", f"\n\n{formatar_links(urls)}\n📈 Similaridade: {melhor_score:.4f}")
+            if completa:
+                self.salvar_cache(chave_cache, subcategoria_id, resposta_humana, urls, melhor_score, versao, emb_pergunta)
+            self.concluir(tarefa, "vetorial", resposta_humana, urls, melhor_score)
+            return
+
+        tarefa.emitir("limpar")
+        tarefa.emitir("texto", "❌ Nenhuma resposta suficientemente relevante encontrada.")
+        pendencia = False
+        try:
+            tarefa.etapa(
+                "pendência", banco.com_transacao, enfileirar_pendencia,
+                pergunta, categoria_id, subcategoria_id, usuario_id, timeout=TIMEOUT_BANCO
+            )
+            pendencia = True
+            tarefa.emitir("texto", "\n📌 A pergunta foi enviada para análise por outro agente de IA.")
+        except TarefaCancelada:
+            raise
+        except Exception as e:
+            tarefa.emitir("texto", f"\n⚠️ Falha ao enviar para o agente secundário: {e}")
+        self.concluir(tarefa, "sem_resposta", "", "", melhor_score, pendencia=pendencia)
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+import unicodedata
+from collections import deque
+
+from db import executar_preparada
+
+PALAVRAS_VERIFICACAO_SEGUNDOS = float(os.environ.get("PALAVRAS_VERIFICACAO_SEGUNDOS", "10"))
+
+SQL_ASSINATURA = """
+    SELECT COUNT(*), md5(COALESCE(string_agg(p.documento_id || ':' || p.palavra, ',' ORDER BY p.documento_id, p.palavra), ''))
+    FROM bloqueio_v2.documento d
+    JOIN bloqueio_v2.documento_palavra_chave p ON d.documento_id = p.documento_id
+    WHERE d.subcategoria_id = %s
+"""
+
+SQL_PALAVRAS = """
+    SELECT d.documento_id, d.url_arquivo, d.titulo, p.palavra
+    FROM bloqueio_v2.documento d
+    JOIN bloqueio_v2.documento_palavra_chave p ON d.documento_id = p.documento_id
+    WHERE d.subcategoria_id = %s
+"""
+
+
+def normalizar_texto(texto):
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+class AhoCorasick:
+    def __init__(self):
+        self._transicoes = [{}]
+        self._falha = [0]
+        self._saidas = [[]]
+        self._padroes = {}
+
+    def __len__(self):
+        return len(self._padroes)
+
+    def __contains__(self, padrao):
+        return padrao in self._padroes
+
+    def adicionar(self, padrao, valor):
+        if not padrao:
+            return
+        if padrao in self._padroes:
+            self._padroes[padrao].append(valor)
+            return
+        estado = 0
+        for caractere in padrao:
+            proximo = self._transicoes[estado].get(caractere)
+            if proximo is None:
+                proximo = len(self._transicoes)
+                self._transicoes.append({})
+                self._falha.append(0)
+                self._saidas.append([])
+                self._transicoes[estado][caractere] = proximo
+            estado = proximo
+        self._saidas[estado].append(padrao)
+        self._padroes[padrao] = [valor]
+
+    def construir(self):
+        fila = deque()
+        for proximo in self._transicoes[0].values():
+            self._falha[proximo] = 0
+            fila.append(proximo)
+        while fila:
+            estado = fila.popleft()
+            for caractere, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falha[estado]
+                while falha and caractere not in self._transicoes[falha]:
+                    falha = self._falha[falha]
+                destino = self._transicoes[falha].get(caractere, 0)
+                self._falha[proximo] = destino if destino != proximo else 0
+
+    def buscar(self, texto):
+        estado = 0
+        for fim, caractere in enumerate(texto):
+            while estado and caractere not in self._transicoes[estado]:
+                estado = self._falha[estado]
+            estado = self._transicoes[estado].get(caractere, 0)
+            saida = estado
+            while saida:
+                for padrao in self._saidas[saida]:
+                    yield fim - len(padrao) + 1, fim + 1, padrao
+                saida = self._falha[saida]
+
+    def valores(self, padrao):
+        return self._padroes.get(padrao, [])
+
+
+def limite_de_palavra(texto, inicio, fim):
+    antes = inicio == 0 or not texto[inicio - 1].isalnum()
+    depois = fim == len(texto) or not texto[fim].isalnum()
+    return antes and depois
+
+
+class AutomatoSubcategoria:
+    def __init__(self):
+        self.automato = AhoCorasick()
+        self.linhas = set()
+        self.assinatura = None
+        self.verificado_em = 0.0
+
+    def sincronizar(self, assinatura, linhas):
+        linhas = set(linhas)
+        removidas = self.linhas - linhas
+        if removidas:
+            self.automato = AhoCorasick()
+            novas = linhas
+        else:
+            novas = linhas - self.linhas
+        for linha in novas:
+            self.automato.adicionar(normalizar_texto(linha[3]).strip(), linha)
+        if novas:
+            self.automato.construir()
+        self.linhas = linhas
+        self.assinatura = assinatura
+        self.verificado_em = time.monotonic()
+
+    def encontrar(self, pergunta):
+        texto = normalizar_texto(pergunta)
+        encontradas = []
+        vistos = set()
+        for inicio, fim, padrao in self.automato.buscar(texto):
+            if padrao in vistos or not limite_de_palavra(texto, inicio, fim):
+                continue
+            vistos.add(padrao)
+            encontradas.extend(sorted(self.automato.valores(padrao)))
+        return encontradas
+
+
+class MatcherPalavrasChave:
+    def __init__(self, intervalo_verificacao=PALAVRAS_VERIFICACAO_SEGUNDOS, snapshot=None):
+        self.intervalo_verificacao = intervalo_verificacao
+        self.snapshot = snapshot
+        self._automatos = {}
+        self._locks = {}
+        self._lock = threading.RLock()
+
+    def _lock_subcategoria(self, subcategoria_id):
+        with self._lock:
+            return self._locks.setdefault(subcategoria_id, threading.RLock())
+
+    def obter(self, cursor, subcategoria_id):
+        with self._lock_subcategoria(subcategoria_id):
+            automato = self._automatos.get(subcategoria_id)
+            if automato and time.monotonic() - automato.verificado_em < self.intervalo_verificacao:
+                return automato
+
+            executar_preparada(cursor, "palavras_assinatura", SQL_ASSINATURA, (subcategoria_id,))
+            assinatura = tuple(cursor.fetchone())
+            if automato and automato.assinatura == assinatura:
+                automato.verificado_em = time.monotonic()
+                return automato
+
+            linhas = self.snapshot.carregar_palavras(subcategoria_id, assinatura) if self.snapshot else None
+            if linhas is None:
+                executar_preparada(cursor, "palavras_subcategoria", SQL_PALAVRAS, (subcategoria_id,))
+                linhas = cursor.fetchall()
+                if self.snapshot:
+                    self.snapshot.salvar_palavras(subcategoria_id, assinatura, linhas)
+            automato = automato or AutomatoSubcategoria()
+            automato.sincronizar(assinatura, linhas)
+            self._automatos[subcategoria_id] = automato
+            return automato
+
+    def encontrar(self, cursor, subcategoria_id, pergunta):
+        with self._lock_subcategoria(subcategoria_id):
+            return self.obter(cursor, subcategoria_id).encontrar(pergunta)
@@ -0,0 +1,166 @@
+import math
+import os
+import re
+
+import numpy as np
+
+from ingestao_embeddings import estimar_tokens
+from palavras_chave import normalizar_texto
+
+RECUPERACAO_K = int(os.environ.get("RECUPERACAO_K", "5"))
+RECUPERACAO_CANDIDATOS = int(os.environ.get("RECUPERACAO_CANDIDATOS", "20"))
+RECUPERACAO_LIMIAR_CONTEXTO = float(os.environ.get("RECUPERACAO_LIMIAR_CONTEXTO", "0.75"))
+RERANK_BM25 = os.environ.get("RERANK_BM25", "1") == "1"
+RERANK_PESO = float(os.environ.get("RERANK_PESO", "0.3"))
+CONTEXTO_MAX_TOKENS = int(os.environ.get("CONTEXTO_MAX_TOKENS", "1500"))
+BUSCA_HIBRIDA = os.environ.get("BUSCA_HIBRIDA", "1") == "1"
+HIBRIDA_COBERTURA = float(os.environ.get("HIBRIDA_COBERTURA", "0.8"))
+HIBRIDA_MIN_TERMOS = int(os.environ.get("HIBRIDA_MIN_TERMOS", "2"))
+HIBRIDA_MARGEM = float(os.environ.get("HIBRIDA_MARGEM", "1.5"))
+HIBRIDA_COBERTURA_CONTEXTO = float(os.environ.get("HIBRIDA_COBERTURA_CONTEXTO", "0.5"))
+RRF_K = 60
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def termos(texto):
+    return re.findall(r"\w+", normalizar_texto(texto))
+
+
+class IndiceLexico:
+    def __init__(self, documento_ids, titulos, urls, paragrafos, k1=BM25_K1, b=BM25_B):
+        self.documento_ids = list(documento_ids)
+        self.titulos = list(titulos)
+        self.urls = list(urls)
+        self.paragrafos = list(paragrafos)
+        self.k1 = k1
+        self.b = b
+        self.posicoes = {(d, p): i for i, (d, p) in enumerate(zip(self.documento_ids, self.paragrafos))}
+
+        ocorrencias = {}
+        comprimentos = []
+        for i, paragrafo in enumerate(self.paragrafos):
+            lista = termos(paragrafo)
+            comprimentos.append(len(lista))
+            contagem = {}
+            for termo in lista:
+                contagem[termo] = contagem.get(termo, 0) + 1
+            for termo, tf in contagem.items():
+                ocorrencias.setdefault(termo, ([], []))
+                ocorrencias[termo][0].append(i)
+                ocorrencias[termo][1].append(tf)
+
+        total = len(self.paragrafos)
+        self.comprimentos = np.asarray(comprimentos, dtype=np.float32)
+        media = float(self.comprimentos.mean()) if total else 0.0
+        self.normalizacao = k1 * (1 - b + b * self.comprimentos / media) if media else np.full(total, k1, dtype=np.float32)
+        self.postings = {}
+        for termo, (indices, tfs) in ocorrencias.items():
+            df = len(indices)
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            self.postings[termo] = (np.asarray(indices), np.asarray(tfs, dtype=np.float32), idf)
+
+    def __len__(self):
+        return len(self.paragrafos)
+
+    def pontuar(self, consulta):
+        scores = np.zeros(len(self), dtype=np.float32)
+        for termo in set(termos(consulta)):
+            posting = self.postings.get(termo)
+            if posting is None:
+                continue
+            indices, tfs, idf = posting
+            scores[indices] += idf * tfs * (self.k1 + 1) / (tfs + self.normalizacao[indices])
+        return scores
+
+    def buscar(self, consulta, k, documentos=None, por_documento=None):
+        scores = self.pontuar(consulta)
+        candidatos = np.arange(len(self))
+        if documentos is not None:
+            candidatos = candidatos[np.isin(np.asarray(self.documento_ids), list(documentos))]
+        resultado, usados = [], {}
+        for i in candidatos[np.argsort(-scores[candidatos], kind="stable")]:
+            documento_id = self.documento_ids[i]
+            if por_documento and usados.get(documento_id, 0) >= por_documento:
+                continue
+            usados[documento_id] = usados.get(documento_id, 0) + 1
+            resultado.append({
+                "documento_id": documento_id,
+                "titulo": self.titulos[i],
+                "url": self.urls[i],
+                "paragrafo": self.paragrafos[i],
+                "score_lexico": float(scores[i]),
+            })
+            if len(resultado) >= k:
+                break
+        return resultado
+
+    def reordenar(self, consulta, passagens, peso=RERANK_PESO):
+        scores = self.pontuar(consulta)
+        lexicos = []
+        for passagem in passagens:
+            i = self.posicoes.get((passagem["documento_id"], passagem["paragrafo"]))
+            lexicos.append(float(scores[i]) if i is not None else 0.0)
+        maximo = max(lexicos, default=0.0) or 1.0
+        for passagem, lexico in zip(passagens, lexicos):
+            passagem["score_lexico"] = lexico
+            passagem["score_final"] = (1 - peso) * passagem["score"] + peso * lexico / maximo
+        return sorted(passagens, key=lambda p: p["score_final"], reverse=True)
+
+
+def empacotar_contexto(passagens, max_tokens=CONTEXTO_MAX_TOKENS):
+    escolhidas, usados = [], 0
+    for passagem in passagens:
+        tokens = estimar_tokens(passagem["paragrafo"])
+        if escolhidas and usados + tokens > max_tokens:
+            continue
+        escolhidas.append(passagem)
+        usados += tokens
+    return escolhidas
+
+
+def selecionar_passagens(pergunta, candidatos, lexico=None, k=RECUPERACAO_K,
+                         limiar=RECUPERACAO_LIMIAR_CONTEXTO, max_tokens=CONTEXTO_MAX_TOKENS):
+    if lexico is not None:
+        candidatos = lexico.reordenar(pergunta, candidatos)
+    relevantes = [c for c in candidatos if c["score"] >= limiar][:k]
+    return empacotar_contexto(relevantes, max_tokens)
+
+
+def lexico_decisivo(resultados, cobertura=HIBRIDA_COBERTURA, min_termos=HIBRIDA_MIN_TERMOS, margem=HIBRIDA_MARGEM):
+    if not resultados:
+        return False
+    melhor = resultados[0]
+    if melhor["termos"] < min_termos or melhor["cobertura"] < cobertura:
+        return False
+    return len(resultados) == 1 or melhor["rank"] >= margem * resultados[1]["rank"]
+
+
+def fundir_rrf(*listas, k=RRF_K):
+    fundidos = {}
+    for lista in listas:
+        for posicao, passagem in enumerate(lista, 1):
+            chave = (passagem["documento_id"], passagem["paragrafo"])
+            atual = fundidos.setdefault(chave, {"score_rrf": 0.0})
+            for campo, valor in passagem.items():
+                atual.setdefault(campo, valor)
+            atual["score_rrf"] += 1.0 / (k + posicao)
+    return sorted(fundidos.values(), key=lambda p: p["score_rrf"], reverse=True)
+
+
+def selecionar_hibridas(vetoriais, lexicos, k=RECUPERACAO_K, limiar=RECUPERACAO_LIMIAR_CONTEXTO,
+                        cobertura=HIBRIDA_COBERTURA_CONTEXTO, max_tokens=CONTEXTO_MAX_TOKENS):
+    relevantes = [v for v in vetoriais if v["score"] >= limiar]
+    textuais = [t for t in lexicos if t["cobertura"] >= cobertura]
+    return empacotar_contexto(fundir_rrf(relevantes, textuais)[:k], max_tokens)
+
+
+def montar_contexto(passagens):
+    return "\n\n".join(
+        f"[{i}] {p['titulo']}\n{p['paragrafo']}" for i, p in enumerate(passagens, 1)
+    )
+
+
+def urls_passagens(passagens):
+    return list(dict.fromkeys(p["url"] for p in passagens))
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import threading
+
+from aiohttp import web
+
+from db import BancoDados, listar_categorias, listar_subcategorias
+from execucao import EtapaExpirada, Executor, Tarefa
+from metricas import metricas
+from motor import USUARIO_ID, MotorBusca
+from snapshot import obter_snapshot
+
+SERVIDOR_HOST = os.environ.get("SERVIDOR_HOST", "127.0.0.1")
+SERVIDOR_PORTA = int(os.environ.get("SERVIDOR_PORTA", "8080"))
+SERVIDOR_WORKERS = int(os.environ.get("SERVIDOR_WORKERS", "16"))
+SERVIDOR_TIMEOUT = float(os.environ.get("SERVIDOR_TIMEOUT", "90"))
+
+FINAIS = ("fim", "erro", "cancelada")
+
+CHAVE_MOTOR = web.AppKey("motor", MotorBusca)
+CHAVE_WORKERS = web.AppKey("workers", int)
+CHAVE_EXECUTOR = web.AppKey("executor", Executor)
+CHAVE_DESPACHANTE = web.AppKey("despachante", object)
+CHAVE_AQUECIMENTO = web.AppKey("aquecimento", Tarefa)
+
+
+class Despachante:
+    def __init__(self, executor, loop):
+        self.executor = executor
+        self.loop = loop
+        self._filas = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._distribuir, daemon=True, name="despachante")
+        self._thread.start()
+
+    def submeter(self, funcao, *args, **kwargs):
+        fila = asyncio.Queue()
+        with self._lock:
+            tarefa = self.executor.submeter(funcao, *args, **kwargs)
+            self._filas[tarefa.id] = fila
+        return tarefa, fila
+
+    def liberar(self, tarefa):
+        with self._lock:
+            self._filas.pop(tarefa.id, None)
+
+    def _distribuir(self):
+        while True:
+            tarefa, tipo, dados = self.executor.fila.get()
+            if tarefa is None:
+                return
+            with self._lock:
+                fila = self._filas.get(tarefa.id)
+            if fila is not None:
+                self.loop.call_soon_threadsafe(fila.put_nowait, (tipo, dados))
+
+    def encerrar(self):
+        self.executor.fila.put((None, None, None))
+
+
+async def eventos(fila, timeout):
+    limite = asyncio.get_running_loop().time() + timeout
+    while True:
+        restante = limite - asyncio.get_running_loop().time()
+        if restante <= 0:
+            raise asyncio.TimeoutError()
+        tipo, dados = await asyncio.wait_for(fila.get(), restante)
+        yield tipo, dados
+        if tipo in FINAIS:
+            return
+
+
+def erro_json(status, mensagem):
+    return web.json_response({"erro": mensagem}, status=status)
+
+
+def ler_pergunta(corpo):
+    pergunta = str(corpo.get("pergunta") or "").strip()
+    if not pergunta:
+        raise ValueError("Informe a pergunta.")
+    try:
+        categoria_id = int(corpo["categoria_id"])
+        subcategoria_id = int(corpo["subcategoria_id"])
+        usuario_id = int(corpo.get("usuario_id", USUARIO_ID))
+        timeout = min(float(corpo.get("timeout", SERVIDOR_TIMEOUT)), SERVIDOR_TIMEOUT)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Informe categoria_id e subcategoria_id numéricos.")
+    return pergunta, categoria_id, subcategoria_id, usuario_id, timeout
+
+
+async def perguntar(request):
+    try:
+        corpo = await request.json()
+    except ValueError:
+        return erro_json(400, "JSON inválido.")
+    if not isinstance(corpo, dict):
+        return erro_json(400, "Envie um objeto JSON.")
+    try:
+        pergunta, categoria_id, subcategoria_id, usuario_id, timeout = ler_pergunta(corpo)
+    except ValueError as e:
+        return erro_json(400, str(e))
+
+    streaming = bool(corpo.get("stream")) or "application/x-ndjson" in request.headers.get("Accept", "")
+    despachante = request.app[CHAVE_DESPACHANTE]
+    tarefa, fila = despachante.submeter(
+        request.app[CHAVE_MOTOR].buscar, pergunta, categoria_id, subcategoria_id, usuario_id=usuario_id
+    )
+    try:
+        if streaming:
+            return await transmitir(request, fila, timeout)
+        return await responder_json(fila, timeout)
+    finally:
+        tarefa.cancelar()
+        despachante.liberar(tarefa)
+
+
+async def responder_json(fila, timeout):
+    texto, resultado = [], {}
+    try:
+        async for tipo, dados in eventos(fila, timeout):
+            if tipo == "limpar":
+                texto.clear()
+            elif tipo == "texto":
+                texto.append(dados)
+            elif tipo == "resultado":
+                resultado = dados
+            elif tipo == "erro":
+                return erro_json(504 if isinstance(dados, EtapaExpirada) else 500, str(dados))
+            elif tipo == "cancelada":
+                return erro_json(503, "Busca cancelada.")
+    except asyncio.TimeoutError:
+        metricas.contar("servidor", "expirada")
+        return erro_json(504, f"A busca excedeu o tempo limite de {timeout:g}s.")
+    return web.json_response({**resultado, "texto": "".join(texto)})
+
+
+async def transmitir(request, fila, timeout):
+    resposta = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+    await resposta.prepare(request)
+
+    async def enviar(evento):
+        await resposta.write((json.dumps(evento, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    try:
+        async for tipo, dados in eventos(fila, timeout):
+            if tipo == "texto":
+                await enviar({"tipo": tipo, "texto": dados})
+            elif tipo == "resultado":
+                await enviar({"tipo": tipo, **dados})
+            elif tipo == "erro":
+                await enviar({"tipo": tipo, "erro": str(dados)})
+            else:
+                await enviar({"tipo": tipo})
+    except asyncio.TimeoutError:
+        metricas.contar("servidor", "expirada")
+        await enviar({"tipo": "erro", "erro": f"A busca excedeu o tempo limite de {timeout:g}s."})
+    await resposta.write_eof()
+    return resposta
+
+
+async def categorias(request):
+    linhas = await consultar(request, listar_categorias)
+    return web.json_response([{"categoria_id": id, "nome": nome} for id, nome in linhas])
+
+
+async def subcategorias(request):
+    try:
+        categoria_id = int(request.match_info["categoria_id"])
+    except ValueError:
+        return erro_json(400, "categoria_id deve ser numérico.")
+    linhas = await consultar(request, listar_subcategorias, categoria_id)
+    return web.json_response([{"subcategoria_id": id, "nome": nome} for id, nome in linhas])
+
+
+async def consultar(request, funcao, *args):
+    banco = request.app[CHAVE_MOTOR].banco
+    return await asyncio.get_running_loop().run_in_executor(None, banco.com_cursor, funcao, *args)
+
+
+async def exportar_metricas(request):
+    return web.Response(text=metricas.exportar_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+async def saude(request):
+    return web.json_response({"status": "ok", "etapas_orfas": request.app[CHAVE_EXECUTOR].etapas_orfas})
+
+
+async def iniciar(app):
+    app[CHAVE_EXECUTOR] = Executor(workers=app[CHAVE_WORKERS])
+    app[CHAVE_DESPACHANTE] = Despachante(app[CHAVE_EXECUTOR], asyncio.get_running_loop())
+    app[CHAVE_AQUECIMENTO] = app[CHAVE_EXECUTOR].submeter(app[CHAVE_MOTOR].iniciar)
+
+
+async def encerrar(app):
+    app[CHAVE_AQUECIMENTO].cancelar()
+    app[CHAVE_DESPACHANTE].encerrar()
+    app[CHAVE_EXECUTOR].encerrar()
+    app[CHAVE_MOTOR].banco.fechar()
+
+
+def criar_app(motor=None, workers=SERVIDOR_WORKERS):
+    app = web.Application()
+    app[CHAVE_MOTOR] = motor or MotorBusca(BancoDados(), snapshot=obter_snapshot())
+    app[CHAVE_WORKERS] = workers
+    app.on_startup.append(iniciar)
+    app.on_cleanup.append(encerrar)
+    app.router.add_post("/perguntas", perguntar)
+    app.router.add_get("/categorias", categorias)
+    app.router.add_get("/categorias/{categoria_id}/subcategorias", subcategorias)
+    app.router.add_get("/metrics", exportar_metricas)
+    app.router.add_get("/saude", saude)
+    return app
+
+
+if __name__ == "__main__":
+    app = criar_app()
+    web.run_app(app, host=SERVIDOR_HOST, port=SERVIDOR_PORTA)
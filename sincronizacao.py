@@ -0,0 +1,174 @@
+import hashlib
+from collections import namedtuple
+from io import BytesIO
+
+import requests
+from docx import Document
+from psycopg2.extras import execute_values
+
+from cache_respostas import CacheRespostas
+from chunker import obter_chunker
+from ingestao_embeddings import gerar_embeddings, inserir_paragrafos
+
+Diferencas = namedtuple("Diferencas", ["novos", "removidos", "reordenados"])
+
+
+def hash_paragrafo(texto):
+    return hashlib.md5(texto.encode("utf-8")).hexdigest()
+
+
+def baixar_documento(url, etag=None, ultima_modificacao=None, timeout=30):
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if ultima_modificacao:
+        headers["If-Modified-Since"] = ultima_modificacao
+    resp = requests.get(url, headers=headers, timeout=timeout)
+    if resp.status_code == 304:
+        return None
+    resp.raise_for_status()
+    return resp.content, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+
+def abrir_docx(conteudo):
+    return Document(BytesIO(conteudo))
+
+
+def textos_docx(doc):
+    return [p.text.strip() for p in doc.paragraphs if p.text.strip()]
+
+
+def ler_docx(conteudo):
+    return textos_docx(abrir_docx(conteudo))
+
+
+def extrair_paragrafos(conteudo, chunker=None):
+    return (chunker or obter_chunker()).dividir(abrir_docx(conteudo))
+
+
+def calcular_diferencas(paragrafos, existentes):
+    desejados = {}
+    for ordem, texto in enumerate(paragrafos):
+        desejados.setdefault(hash_paragrafo(texto), (ordem, texto))
+    novos = [(ordem, texto, h) for h, (ordem, texto) in desejados.items() if h not in existentes]
+    removidos = [h for h in existentes if h not in desejados]
+    reordenados = [
+        (ordem, h) for h, (ordem, _) in desejados.items() if h in existentes and existentes[h] != ordem
+    ]
+    return Diferencas(novos, removidos, reordenados)
+
+
+def aplicar_diferencas(cursor, documento_id, diferencas):
+    if diferencas.removidos:
+        cursor.execute(
+            """
+            DELETE FROM bloqueio_v2.documento_paragrafo_embedding
+            WHERE documento_id = %s AND hash_conteudo = ANY(%s)
+            """,
+            (documento_id, diferencas.removidos),
+        )
+    if diferencas.reordenados:
+        execute_values(
+            cursor,
+            """
+            UPDATE bloqueio_v2.documento_paragrafo_embedding AS e SET ordem = v.ordem
+            FROM (VALUES %s) AS v (ordem, hash_conteudo)
+            WHERE e.documento_id = {} AND e.hash_conteudo = v.hash_conteudo
+            """.format(int(documento_id)),
+            diferencas.reordenados,
+        )
+    if diferencas.novos:
+        textos = [texto for _, texto, _ in diferencas.novos]
+        embeddings = gerar_embeddings(textos)
+        inserir_paragrafos(
+            cursor,
+            documento_id,
+            textos,
+            embeddings,
+            hashes=[h for _, _, h in diferencas.novos],
+            ordens=[ordem for ordem, _, _ in diferencas.novos],
+        )
+
+
+def sincronizar_paragrafos(cursor, documento_id, paragrafos):
+    cursor.execute(
+        """
+        DELETE FROM bloqueio_v2.documento_paragrafo_embedding a
+        USING bloqueio_v2.documento_paragrafo_embedding b
+        WHERE a.documento_id = %s AND b.documento_id = a.documento_id
+          AND a.hash_conteudo = b.hash_conteudo AND a.ctid > b.ctid
+        """,
+        (documento_id,),
+    )
+    duplicados = cursor.rowcount
+    cursor.execute(
+        """
+        SELECT hash_conteudo, ordem FROM bloqueio_v2.documento_paragrafo_embedding
+        WHERE documento_id = %s
+        """,
+        (documento_id,),
+    )
+    existentes = dict(cursor.fetchall())
+    diferencas = calcular_diferencas(paragrafos, existentes)
+    aplicar_diferencas(cursor, documento_id, diferencas)
+    alterado = bool(diferencas.novos or diferencas.removidos or diferencas.reordenados or duplicados)
+    return diferencas, alterado
+
+
+def hash_documento(conteudo):
+    return hashlib.md5(conteudo).hexdigest()
+
+
+def registrar_versao(cursor, documento_id, etag, ultima_modificacao, alterado, hash_conteudo=None):
+    cursor.execute(
+        """
+        UPDATE bloqueio_v2.documento
+        SET etag = %s, ultima_modificacao = %s, versao = versao + %s,
+            hash_conteudo = COALESCE(%s, hash_conteudo)
+        WHERE documento_id = %s
+        RETURNING subcategoria_id
+        """,
+        (etag, ultima_modificacao, 1 if alterado else 0, hash_conteudo, documento_id),
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def invalidar_respostas(subcategorias):
+    subcategorias = {s for s in subcategorias if s is not None}
+    if not subcategorias:
+        return
+    cache = CacheRespostas()
+    for subcategoria_id in subcategorias:
+        cache.invalidar_subcategoria(subcategoria_id)
+
+
+def sincronizar_documento(conn, cursor, documento_id, documento_url, forcar=False):
+    cursor.execute(
+        "SELECT etag, ultima_modificacao FROM bloqueio_v2.documento WHERE documento_id = %s",
+        (documento_id,),
+    )
+    row = cursor.fetchone()
+    etag, ultima_modificacao = (None, None) if forcar or not row else row
+
+    baixado = baixar_documento(documento_url, etag, ultima_modificacao)
+    if baixado is None:
+        print("Documento não modificado desde a última sincronização.")
+        return None
+    conteudo, etag, ultima_modificacao = baixado
+
+    paragrafos = extrair_paragrafos(conteudo)
+    print(f"Total de parágrafos com conteúdo relevante: {len(paragrafos)}")
+
+    diferencas, alterado = sincronizar_paragrafos(cursor, documento_id, paragrafos)
+    subcategoria_id = registrar_versao(
+        cursor, documento_id, etag, ultima_modificacao, alterado, hash_documento(conteudo)
+    )
+    conn.commit()
+    if alterado:
+        invalidar_respostas([subcategoria_id])
+    print(
+        f"Sincronização concluída: {len(diferencas.novos)} novo(s), "
+        f"{len(diferencas.removidos)} removido(s), {len(diferencas.reordenados)} reordenado(s)."
+    )
+    return diferencas
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from indice_embeddings import IndiceSubcategoria
+from metricas import metricas
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshot_indices")
+
+
+def hash_assinatura(assinatura):
+    return hashlib.md5(json.dumps(list(assinatura), default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def gravar_json(caminho, dados):
+    temporario = f"{caminho}.tmp{os.getpid()}-{threading.get_ident()}"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def ler_json(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+class Snapshot:
+    def __init__(self, diretorio=SNAPSHOT_DIR):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, tipo, subcategoria_id, assinatura, extensao=""):
+        return os.path.join(self.diretorio, f"{tipo}-{subcategoria_id}-{hash_assinatura(assinatura)}{extensao}")
+
+    def _remover_antigos(self, tipo, subcategoria_id, atual):
+        prefixo = f"{tipo}-{subcategoria_id}-"
+        for nome in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome)
+            if not nome.startswith(prefixo) or caminho == atual or ".tmp" in nome:
+                continue
+            if os.path.isdir(caminho):
+                shutil.rmtree(caminho, ignore_errors=True)
+            else:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+    def carregar_indice(self, subcategoria_id, assinatura):
+        destino = self._caminho("indice", subcategoria_id, assinatura)
+        if not os.path.exists(os.path.join(destino, "meta.json")):
+            return None
+        try:
+            with metricas.medir("indice", "snapshot"):
+                meta = ler_json(os.path.join(destino, "meta.json"))
+                matriz = np.load(os.path.join(destino, "matriz.npy"), mmap_mode="r")
+                matriz_documentos = np.load(os.path.join(destino, "documentos.npy"))
+                sem_vetor = np.load(os.path.join(destino, "sem_vetor.npy"))
+        except (OSError, ValueError) as e:
+            print(f"Snapshot do índice da subcategoria {subcategoria_id} ilegível ({e}); recarregando do banco.")
+            return None
+        if tuple(meta["assinatura"]) != tuple(assinatura) or len(matriz) != len(meta["paragrafos"]):
+            return None
+        return IndiceSubcategoria(
+            tuple(meta["assinatura"]), meta["documento_ids"], meta["titulos"], meta["urls"], meta["paragrafos"],
+            matriz, [tuple(faixa) for faixa in meta["faixas"]], matriz_documentos, sem_vetor,
+        )
+
+    def salvar_indice(self, subcategoria_id, indice):
+        if len(indice) == 0:
+            return
+        destino = self._caminho("indice", subcategoria_id, indice.assinatura)
+        temporario = f"{destino}.tmp{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(temporario)
+            np.save(os.path.join(temporario, "matriz.npy"), np.ascontiguousarray(indice.matriz, dtype=np.float32))
+            np.save(os.path.join(temporario, "documentos.npy"), indice.matriz_documentos.astype(np.float32))
+            np.save(os.path.join(temporario, "sem_vetor.npy"), indice.sem_vetor)
+            gravar_json(os.path.join(temporario, "meta.json"), {
+                "assinatura": list(indice.assinatura),
+                "documento_ids": list(indice.documento_ids),
+                "titulos": list(indice.titulos),
+                "urls": list(indice.urls),
+                "paragrafos": list(indice.paragrafos),
+                "faixas": [list(faixa) for faixa in indice.faixas],
+            })
+            os.replace(temporario, destino)
+        except OSError as e:
+            print(f"Erro ao gravar snapshot do índice da subcategoria {subcategoria_id}: {e}")
+            shutil.rmtree(temporario, ignore_errors=True)
+            return
+        self._remover_antigos("indice", subcategoria_id, destino)
+
+    def carregar_palavras(self, subcategoria_id, assinatura):
+        caminho = self._caminho("palavras", subcategoria_id, assinatura, ".json")
+        if not os.path.exists(caminho):
+            return None
+        try:
+            dados = ler_json(caminho)
+        except (OSError, ValueError) as e:
+            print(f"Snapshot de palavras-chave da subcategoria {subcategoria_id} ilegível ({e}); recarregando do banco.")
+            return None
+        if tuple(dados["assinatura"]) != tuple(assinatura):
+            return None
+        return [tuple(linha) for linha in dados["linhas"]]
+
+    def salvar_palavras(self, subcategoria_id, assinatura, linhas):
+        caminho = self._caminho("palavras", subcategoria_id, assinatura, ".json")
+        try:
+            gravar_json(caminho, {"assinatura": list(assinatura), "linhas": [list(linha) for linha in linhas]})
+        except OSError as e:
+            print(f"Erro ao gravar snapshot de palavras-chave da subcategoria {subcategoria_id}: {e}")
+            return
+        self._remover_antigos("palavras", subcategoria_id, caminho)
+
+    def carregar_categorias(self):
+        try:
+            return ler_json(os.path.join(self.diretorio, "categorias.json"))
+        except (OSError, ValueError):
+            return None
+
+    def salvar_categorias(self, arvore):
+        try:
+            gravar_json(os.path.join(self.diretorio, "categorias.json"), arvore)
+        except OSError as e:
+            print(f"Erro ao gravar snapshot de categorias: {e}")
+
+
+def obter_snapshot():
+    if not SNAPSHOT_DIR:
+        return None
+    try:
+        return Snapshot()
+    except OSError as e:
+        print(f"Snapshot desativado; não foi possível usar {SNAPSHOT_DIR}: {e}")
+        return None
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+STUB_PORTA = int(os.environ.get("STUB_PORTA", "8089"))
+STUB_DIMENSAO = int(os.environ.get("STUB_DIMENSAO", "1536"))
+STUB_LATENCIA_MS = float(os.environ.get("STUB_LATENCIA_MS", "0"))
+STUB_TAXA_429 = float(os.environ.get("STUB_TAXA_429", "0"))
+STUB_TOKEN_MS = float(os.environ.get("STUB_TOKEN_MS", "20"))
+STUB_TRUNCAR = int(os.environ.get("STUB_TRUNCAR", "0"))
+
+_vetores_palavras = {}
+_lock = threading.Lock()
+
+
+def vetor_palavra(palavra):
+    with _lock:
+        vetor = _vetores_palavras.get(palavra)
+        if vetor is None:
+            semente = int.from_bytes(hashlib.sha256(palavra.encode("utf-8")).digest()[:8], "little")
+            vetor = np.random.default_rng(semente).standard_normal(STUB_DIMENSAO).astype(np.float32)
+            _vetores_palavras[palavra] = vetor
+        return vetor
+
+
+def embedding_falso(texto):
+    palavras = re.findall(r"\w+", texto.lower()) or [""]
+    vetor = np.sum([vetor_palavra(p) for p in palavras], axis=0)
+    norma = np.linalg.norm(vetor)
+    return (vetor / norma if norma else vetor).tolist()
+
+
+def resposta_falsa(mensagens):
+    pergunta = next((m["content"] for m in reversed(mensagens) if m.get("role") == "user"), "")
+    return f"Resposta simulada para: {pergunta[:200]}"
+
+
+def resumos_falsos(mensagens):
+    pedido = next((m["content"] for m in reversed(mensagens) if m.get("role") == "user"), "")
+    itens = re.findall(r"^\d+\.\s*(.+)$", pedido, re.MULTILINE)
+    return json.dumps({"resumos": [item[:80] for item in itens]}, ensure_ascii=False)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def responder_json(self, status, corpo, headers=None):
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def transmitir_chat(self, modelo, texto):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def evento(delta, fim=None):
+            corpo = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": modelo,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": fim}],
+            }
+            self.wfile.write(f"data: {json.dumps(corpo)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            evento({"role": "assistant"})
+            for i, trecho in enumerate(re.findall(r"\S+\s*", texto)):
+                if STUB_TRUNCAR and i >= STUB_TRUNCAR:
+                    return
+                if STUB_TOKEN_MS:
+                    time.sleep(STUB_TOKEN_MS / 1000)
+                evento({"content": trecho})
+            evento({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", "0"))
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        if STUB_LATENCIA_MS:
+            time.sleep(STUB_LATENCIA_MS / 1000)
+        if STUB_TAXA_429 and random.random() < STUB_TAXA_429:
+            self.responder_json(
+                429,
+                {"error": {"message": "Rate limit (stub)", "type": "requests"}},
+                {"Retry-After": "0.1"},
+            )
+            return
+
+        if self.path.endswith("/embeddings"):
+            entradas = corpo.get("input", [])
+            if isinstance(entradas, str):
+                entradas = [entradas]
+            self.responder_json(200, {
+                "object": "list",
+                "model": corpo.get("model", ""),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": embedding_falso(texto)}
+                    for i, texto in enumerate(entradas)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path == "/api/chat":
+            mensagens = corpo.get("messages", [])
+            conteudo = resumos_falsos(mensagens) if corpo.get("format") == "json" else resposta_falsa(mensagens)
+            self.responder_json(200, {
+                "model": corpo.get("model", ""),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "message": {"role": "assistant", "content": conteudo},
+                "done": True,
+                "done_reason": "stop",
+            })
+        elif self.path.endswith("/chat/completions"):
+            texto = resposta_falsa(corpo.get("messages", []))
+            if corpo.get("stream"):
+                self.transmitir_chat(corpo.get("model", ""), texto)
+            else:
+                truncado = bool(STUB_TRUNCAR)
+                if truncado:
+                    texto = "".join(re.findall(r"\S+\s*", texto)[:STUB_TRUNCAR])
+                self.responder_json(200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": corpo.get("model", ""),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": texto},
+                        "finish_reason": "length" if truncado else "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+        else:
+            self.responder_json(404, {"error": {"message": f"Rota desconhecida: {self.path}"}})
+
+
+def iniciar_stub(porta=STUB_PORTA):
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), StubHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else STUB_PORTA
+    print(f"Stub OpenAI (embeddings e chat) em http://127.0.0.1:{porta}/v1 (defina OPENAI_API_BASE)")
+    print(f"Stub Ollama (/api/chat) em http://127.0.0.1:{porta} (defina OLLAMA_HOST)")
+    ThreadingHTTPServer(("127.0.0.1", porta), StubHandler).serve_forever()
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BANCO_TESTE_DSN = os.environ.get("BANCO_TESTE_DSN", "")
+
+
+@pytest.fixture
+def cursor_teste():
+    if not BANCO_TESTE_DSN:
+        pytest.skip("BANCO_TESTE_DSN não definido (banco descartável para testes)")
+    import psycopg2
+
+    from db import ConexaoPreparada
+
+    conn = psycopg2.connect(BANCO_TESTE_DSN, connection_factory=ConexaoPreparada)
+    try:
+        with conn.cursor() as cursor:
+            yield cursor
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    import openai
+
+    import stub_openai
+
+    monkeypatch.setattr(stub_openai, "STUB_TOKEN_MS", 0)
+    monkeypatch.setattr(stub_openai, "STUB_TRUNCAR", 0)
+    servidor = stub_openai.iniciar_stub(0)
+    monkeypatch.setattr(openai, "api_base", f"http://127.0.0.1:{servidor.server_address[1]}/v1")
+    monkeypatch.setattr(openai, "api_key", "stub")
+    try:
+        yield stub_openai
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,50 @@
+import numpy as np
+
+from busca_pgvector import BuscaPgvector
+from formato_embedding import serializar_embedding
+
+DIMENSAO = 8
+GRANDE, PEQUENA = 1, 2
+
+SQL_ESQUEMA = f"""
+    CREATE EXTENSION IF NOT EXISTS vector;
+    CREATE SCHEMA IF NOT EXISTS bloqueio_v2;
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.documento (
+        documento_id SERIAL PRIMARY KEY, titulo TEXT, url_arquivo TEXT, subcategoria_id INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS bloqueio_v2.documento_paragrafo_embedding (
+        documento_id INTEGER, paragrafo TEXT, embedding vector({DIMENSAO})
+    );
+    CREATE INDEX IF NOT EXISTS documento_paragrafo_embedding_teste_hnsw
+        ON bloqueio_v2.documento_paragrafo_embedding USING hnsw (embedding vector_cosine_ops);
+"""
+
+
+def inserir(cursor, subcategoria_id, vetores):
+    cursor.execute(
+        "INSERT INTO bloqueio_v2.documento (titulo, url_arquivo, subcategoria_id) VALUES (%s, %s, %s) RETURNING documento_id",
+        ("teste", "teste", subcategoria_id),
+    )
+    documento_id = cursor.fetchone()[0]
+    for i, vetor in enumerate(vetores):
+        cursor.execute(
+            "INSERT INTO bloqueio_v2.documento_paragrafo_embedding (documento_id, paragrafo, embedding) VALUES (%s, %s, %s::vector)",
+            (documento_id, f"{subcategoria_id}-{i}", serializar_embedding(vetor, "pgvector")),
+        )
+
+
+def test_subcategoria_pequena_devolve_k_resultados(cursor_teste):
+    cursor_teste.execute(SQL_ESQUEMA)
+    cursor_teste.execute("DELETE FROM bloqueio_v2.documento WHERE subcategoria_id IN (%s, %s)", (GRANDE, PEQUENA))
+    rng = np.random.default_rng(7)
+    consulta = rng.normal(size=DIMENSAO).astype(np.float32)
+    inserir(cursor_teste, GRANDE, consulta + rng.normal(0, 0.05, (3000, DIMENSAO)).astype(np.float32))
+    inserir(cursor_teste, PEQUENA, -consulta + rng.normal(0, 0.05, (5, DIMENSAO)).astype(np.float32))
+    cursor_teste.execute("ANALYZE bloqueio_v2.documento_paragrafo_embedding")
+
+    resultados = BuscaPgvector().buscar(cursor_teste, PEQUENA, consulta, k=5, prefiltro=0)
+
+    assert len(resultados) == 5
+    assert all(r["paragrafo"].startswith(f"{PEQUENA}-") for r in resultados)
+    scores = [r["score"] for r in resultados]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,59 @@
+import numpy as np
+
+from cache_respostas import CACHE_SEMANTICO_SOBREPOSICAO, CacheRespostas, chave_resposta, sobreposicao_lexica
+
+PARAFRASES = [
+    ("Como faço para bloquear meu cartão?", "Como bloqueio o cartão?"),
+    ("Qual o prazo para estornar uma compra?", "Em quantos dias a compra é estornada?"),
+    ("Esqueci a senha do aplicativo", "Como recupero a senha do app?"),
+    ("O boleto venceu, consigo pagar ainda?", "Posso pagar um boleto vencido?"),
+]
+QUASE_IGUAIS = [
+    ("Como bloquear o cartão?", "Como desbloquear o cartão?"),
+    ("Como aumentar o limite do cartão?", "Como reduzir o limite do cartão?"),
+    ("Como cancelar o débito automático?", "Como cadastrar o débito automático?"),
+    ("Qual a tarifa do saque no exterior?", "Qual a tarifa do saque no Brasil?"),
+]
+
+
+def test_sobreposicao_ignora_acentos_e_caixa():
+    assert sobreposicao_lexica("Cartão BLOQUEADO", "cartao bloqueado") == 1.0
+    assert sobreposicao_lexica("não", "nao") == 1.0
+
+
+def test_nenhum_limiar_de_sobreposicao_separa_parafrases_de_quase_iguais():
+    menor_parafrase = min(sobreposicao_lexica(a, b) for a, b in PARAFRASES)
+    maior_quase_igual = max(sobreposicao_lexica(a, b) for a, b in QUASE_IGUAIS)
+    assert menor_parafrase < maior_quase_igual
+    assert CACHE_SEMANTICO_SOBREPOSICAO == 0
+
+
+def salvar(cache, pergunta, embedding):
+    cache.salvar(chave_resposta(1, pergunta), 1, f"resposta para {pergunta}", None, 0.9, "v1", embedding)
+
+
+def test_parafrase_acerta_o_cache_com_o_filtro_desligado(tmp_path):
+    cache = CacheRespostas(arquivo=str(tmp_path / "cache.sqlite3"))
+    vetor = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    salvar(cache, PARAFRASES[0][0], vetor)
+
+    entrada = cache.buscar_semelhante(1, PARAFRASES[0][1].lower(), vetor + [0.0, 0.01, 0.0], "v1")
+
+    assert entrada is not None
+    assert entrada["resposta"] == f"resposta para {PARAFRASES[0][0]}"
+
+
+def test_sobreposicao_configurada_recusa_parafrase_distante(tmp_path):
+    cache = CacheRespostas(arquivo=str(tmp_path / "cache.sqlite3"))
+    vetor = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    salvar(cache, PARAFRASES[0][0], vetor)
+
+    assert cache.buscar_semelhante(1, PARAFRASES[0][1].lower(), vetor, "v1", sobreposicao=0.5) is None
+    assert cache.buscar_semelhante(1, PARAFRASES[0][0].lower(), vetor, "v1", sobreposicao=0.5) is not None
+
+
+def test_limiar_de_cosseno_recusa_quase_igual(tmp_path):
+    cache = CacheRespostas(arquivo=str(tmp_path / "cache.sqlite3"))
+    salvar(cache, QUASE_IGUAIS[0][0], np.array([1.0, 0.0, 0.0], dtype=np.float32))
+
+    assert cache.buscar_semelhante(1, QUASE_IGUAIS[0][1].lower(), [0.95, 0.31, 0.0], "v1") is None
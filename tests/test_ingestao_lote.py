@@ -0,0 +1,20 @@
+from ingestao_lote import ler_manifesto
+
+
+def test_manifesto_ignora_linha_com_subcategoria_invalida(tmp_path, capsys):
+    manifesto = tmp_path / "manifesto.csv"
+    manifesto.write_text(
+        "# url;titulo;subcategoria_id\n"
+        "http://docs/a.docx;Manual A;3\n"
+        "http://docs/b.docx;Manual B;três\n"
+        "http://docs/c.docx\n",
+        encoding="utf-8",
+    )
+
+    fontes = ler_manifesto(str(manifesto), 7)
+
+    assert [(f.url_arquivo, f.titulo, f.subcategoria_id) for f in fontes] == [
+        ("http://docs/a.docx", "Manual A", 3),
+        ("http://docs/c.docx", "c", 7),
+    ]
+    assert "Linha 3" in capsys.readouterr().out
@@ -0,0 +1,61 @@
+import motor
+from motor import gerar_resposta_humana
+
+PASSAGENS = [{"titulo": "Manual", "url": "http://docs/1", "paragrafo": "Para bloquear o cartão, use o aplicativo."}]
+
+
+def test_streaming_entrega_trechos_e_resposta_completa(stub, monkeypatch):
+    monkeypatch.setattr(motor, "RESPOSTA_STREAMING", True)
+    trechos = []
+
+    resposta, completa = gerar_resposta_humana("Como bloquear o cartão?", PASSAGENS, ao_receber=trechos.append)
+
+    assert completa
+    assert len(trechos) > 1
+    assert resposta == "".join(trechos).strip()
+    assert resposta.startswith("Resposta simulada para: Pergunta: Como bloquear o cartão?")
+
+
+def test_streaming_interrompido_nao_e_completo(stub, monkeypatch):
+    monkeypatch.setattr(motor, "RESPOSTA_STREAMING", True)
+    monkeypatch.setattr(stub, "STUB_TRUNCAR", 3)
+    trechos = []
+
+    resposta, completa = gerar_resposta_humana("Como bloquear o cartão?", PASSAGENS, ao_receber=trechos.append)
+
+    assert not completa
+    assert len(trechos) == 3
+    assert resposta == "".join(trechos).strip()
+
+
+def test_resposta_truncada_sem_streaming_nao_e_completa(stub, monkeypatch):
+    monkeypatch.setattr(motor, "RESPOSTA_STREAMING", False)
+    monkeypatch.setattr(stub, "STUB_TRUNCAR", 2)
+
+    resposta, completa = gerar_resposta_humana("Como bloquear o cartão?", PASSAGENS)
+
+    assert not completa
+    assert resposta == "Resposta simulada"
+
+
+def test_cancelamento_fecha_o_stream(stub, monkeypatch):
+    monkeypatch.setattr(motor, "RESPOSTA_STREAMING", True)
+    trechos = []
+
+    resposta, completa = gerar_resposta_humana(
+        "Como bloquear o cartão?", PASSAGENS, ao_receber=trechos.append, cancelada=lambda: len(trechos) >= 2
+    )
+
+    assert not completa
+    assert resposta == "".join(trechos).strip()
+    assert len(trechos) == 2
+
+
+def test_falha_da_api_devolve_trecho_e_nao_e_completa(stub, monkeypatch):
+    monkeypatch.setattr(motor.openai, "api_base", "http://127.0.0.1:9/v1")
+    monkeypatch.setattr(motor, "TIMEOUT_LLM", 2)
+
+    resposta, completa = gerar_resposta_humana("Como bloquear o cartão?", PASSAGENS)
+
+    assert not completa
+    assert resposta.endswith(PASSAGENS[0]["paragrafo"])
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import motor
+from cache_respostas import CacheRespostas
+from motor import MotorBusca
+from servidor import criar_app
+
+PASSAGEM = {
+    "documento_id": 1, "titulo": "Manual", "url": "http://docs/1",
+    "paragrafo": "Para bloquear o cartão, use o aplicativo.", "score": 1.0,
+}
+
+
+class CursorFalso:
+    connection = None
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return []
+
+
+class BancoFalso:
+    def com_cursor(self, funcao, *args, **kwargs):
+        return funcao(CursorFalso(), *args, **kwargs)
+
+    com_transacao = com_cursor
+
+    def fechar(self):
+        pass
+
+
+class LexicoFalso:
+    def buscar(self, pergunta, k, documentos=None, por_documento=None):
+        return [PASSAGEM]
+
+
+class IndiceFalso:
+    def versao(self, cursor, subcategoria_id):
+        return "v1"
+
+    def lexico(self, cursor, subcategoria_id):
+        return LexicoFalso()
+
+
+class PalavrasChaveFalsas:
+    def obter(self, cursor, subcategoria_id):
+        return None
+
+    def encontrar(self, cursor, subcategoria_id, pergunta):
+        return [(PASSAGEM["documento_id"], PASSAGEM["titulo"], PASSAGEM["url"], "bloquear")]
+
+
+def perguntar(motor_busca, corpo):
+    async def executar():
+        async with TestClient(TestServer(criar_app(motor_busca, workers=2))) as cliente:
+            resposta = await cliente.post("/perguntas", json=corpo)
+            return resposta.status, resposta.headers["Content-Type"], await resposta.text()
+
+    return asyncio.run(executar())
+
+
+def criar_motor(tmp_path):
+    return MotorBusca(
+        BancoFalso(), IndiceFalso(), CacheRespostas(arquivo=str(tmp_path / "respostas.sqlite3")),
+        PalavrasChaveFalsas(), busca_textual=object(),
+    )
+
+
+def test_perguntas_transmite_ndjson(stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(motor, "RESPOSTA_STREAMING", True)
+    motor_busca = criar_motor(tmp_path)
+
+    status, tipo, corpo = perguntar(
+        motor_busca, {"pergunta": "Como bloquear o cartão?", "categoria_id": 1, "subcategoria_id": 2, "stream": True}
+    )
+
+    assert status == 200
+    assert tipo.startswith("application/x-ndjson")
+    eventos = [json.loads(linha) for linha in corpo.splitlines()]
+    assert [e["tipo"] for e in eventos][-2:] == ["resultado", "fim"]
+    assert sum(e["tipo"] == "texto" for e in eventos) > 3
+    resultado = eventos[-2]
+    assert resultado["origem"] == "palavras_chave"
+    assert resultado["resposta"].startswith("Resposta simulada para: Pergunta: Como bloquear o cartão?")
+    assert resultado["urls"] == [PASSAGEM["url"]]
+    assert resultado["resposta"] in "".join(e["texto"] for e in eventos if e["tipo"] == "texto")
+    assert motor_busca.cache_respostas.obter("2|como bloquear o cartão?", "v1") is not None
+
+
+def test_resposta_truncada_nao_vai_para_o_cache(stub, monkeypatch, tmp_path):
+    monkeypatch.setattr(motor, "RESPOSTA_STREAMING", True)
+    monkeypatch.setattr(stub, "STUB_TRUNCAR", 3)
+    motor_busca = criar_motor(tmp_path)
+
+    status, _, corpo = perguntar(
+        motor_busca, {"pergunta": "Como bloquear o cartão?", "categoria_id": 1, "subcategoria_id": 2, "stream": True}
+    )
+
+    assert status == 200
+    eventos = [json.loads(linha) for linha in corpo.splitlines()]
+    assert eventos[-1]["tipo"] == "fim"
+    assert eventos[-2]["resposta"] == "Resposta simulada para:"
+    assert motor_busca.cache_respostas.obter("2|como bloquear o cartão?", "v1") is None
+
+
+def test_perguntas_sem_subcategoria_responde_400(tmp_path):
+    status, _, corpo = perguntar(criar_motor(tmp_path), {"pergunta": "Oi"})
+
+    assert status == 400
+    assert "subcategoria_id" in json.loads(corpo)["erro"]
@@ -0,0 +1,24 @@
+import pytest
+
+import worker_pendencias
+
+
+class ConexaoFalsa:
+    closed = False
+
+    def cursor(self):
+        raise RuntimeError("tabela pendencia_fila não existe")
+
+    def close(self):
+        self.closed = True
+
+
+def test_falha_ao_preparar_conexao_fecha_a_conexao(monkeypatch):
+    conn = ConexaoFalsa()
+    monkeypatch.setattr(worker_pendencias, "conectar", lambda: conn)
+
+    with pytest.raises(RuntimeError):
+        worker_pendencias.preparar_conexao()
+
+    assert conn.closed
+
@@ -0,0 +1,177 @@
+import os
+import re
+import select
+import time
+from difflib import SequenceMatcher
+
+from db import ERROS_CONEXAO, conectar
+from fila_pendencias import (
+    CANAL_PENDENCIAS,
+    concluir,
+    perguntas_recentes,
+    reabrir_interrompidas,
+    reagendar,
+    reservar_lote,
+)
+from palavras_chave import normalizar_texto
+from salvar_pendencia_mistral import classificar_resumo, inserir_assunto_pendente, resumir_perguntas
+
+PENDENCIA_LOTE = int(os.environ.get("PENDENCIA_LOTE", "10"))
+PENDENCIA_ESPERA = float(os.environ.get("PENDENCIA_ESPERA", "5"))
+PENDENCIA_SIMILARIDADE = float(os.environ.get("PENDENCIA_SIMILARIDADE", "0.9"))
+PENDENCIA_JANELA_DIAS = int(os.environ.get("PENDENCIA_JANELA_DIAS", "7"))
+PENDENCIA_TENTATIVAS = int(os.environ.get("PENDENCIA_TENTATIVAS", "5"))
+PENDENCIA_ESPERA_MAXIMA = float(os.environ.get("PENDENCIA_ESPERA_MAXIMA", "3600"))
+
+
+def chave_comparacao(pergunta):
+    return " ".join(re.findall(r"\w+", normalizar_texto(pergunta)))
+
+
+def quase_identicas(a, b, limiar=PENDENCIA_SIMILARIDADE):
+    if a == b:
+        return True
+    comparador = SequenceMatcher(None, a, b, autojunk=False)
+    return comparador.real_quick_ratio() >= limiar and comparador.quick_ratio() >= limiar and comparador.ratio() >= limiar
+
+
+class PerguntasConhecidas:
+    def __init__(self, perguntas=()):
+        self._chaves = [chave_comparacao(p) for p in perguntas]
+
+    def contem(self, chave):
+        return any(quase_identicas(chave, conhecida) for conhecida in self._chaves)
+
+    def adicionar(self, chave):
+        self._chaves.append(chave)
+
+
+def deduplicar(lote, conhecidas):
+    unicas, duplicadas, chaves = [], [], []
+    for item in lote:
+        chave = chave_comparacao(item[1])
+        if conhecidas.contem(chave) or any(quase_identicas(chave, c) for c in chaves):
+            duplicadas.append(item[0])
+        else:
+            unicas.append(item)
+            chaves.append(chave)
+    return unicas, duplicadas, chaves
+
+
+def devolver(cur, fila_ids, erro):
+    for fila_id, status, tentativas in reagendar(
+        cur, fila_ids, erro, PENDENCIA_TENTATIVAS, PENDENCIA_ESPERA, PENDENCIA_ESPERA_MAXIMA
+    ):
+        if status == "erro":
+            print(f"Pendência {fila_id} descartada após {tentativas} tentativa(s): {erro}")
+        else:
+            print(f"Pendência {fila_id} devolvida à fila (tentativa {tentativas}): {erro}")
+
+
+def processar_lote(conn, lote, conhecidas):
+    unicas, duplicadas, chaves = deduplicar(lote, conhecidas)
+    resumos = resumir_perguntas([item[1] for item in unicas]) if unicas else []
+    salvas, novas_chaves = [], []
+    with conn.cursor() as cur:
+        for item, resumo, chave in zip(unicas, resumos, chaves):
+            cur.execute("SAVEPOINT pendencia")
+            try:
+                categoria_id, subcategoria_id = classificar_resumo(cur, resumo)
+                inserir_assunto_pendente(cur, resumo, categoria_id, subcategoria_id)
+                cur.execute("RELEASE SAVEPOINT pendencia")
+            except ERROS_CONEXAO:
+                raise
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT pendencia")
+                devolver(cur, [item[0]], str(e))
+                continue
+            salvas.append(item[0])
+            novas_chaves.append(chave)
+        concluir(cur, salvas, "salva")
+        concluir(cur, duplicadas, "duplicada")
+    conn.commit()
+    for chave in novas_chaves:
+        conhecidas.adicionar(chave)
+    print(
+        f"Lote processado: {len(salvas)} pendência(s) salva(s), {len(duplicadas)} duplicada(s), "
+        f"{len(unicas) - len(salvas)} devolvida(s) à fila."
+    )
+
+
+def fechar(conn):
+    if conn is not None and not conn.closed:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return None
+
+
+def preparar_conexao():
+    conn = conectar()
+    try:
+        with conn.cursor() as cur:
+            reabertas = reabrir_interrompidas(cur)
+            if reabertas:
+                print(f"{reabertas} pendência(s) interrompida(s) devolvida(s) à fila.")
+            conhecidas = PerguntasConhecidas(perguntas_recentes(cur, PENDENCIA_JANELA_DIAS))
+            cur.execute(f"LISTEN {CANAL_PENDENCIAS}")
+        conn.commit()
+    except Exception:
+        fechar(conn)
+        raise
+    return conn, conhecidas
+
+
+def aguardar_notificacao(conn, espera):
+    if select.select([conn], [], [], espera) != ([], [], []):
+        conn.poll()
+        conn.notifies.clear()
+
+
+def executar():
+    conn = None
+    conhecidas = None
+    falhas = 0
+    try:
+        while True:
+            lote = []
+            try:
+                if conn is None or conn.closed:
+                    conn, conhecidas = preparar_conexao()
+                    print("Worker de pendências conectado; aguardando perguntas.")
+                with conn.cursor() as cur:
+                    lote = reservar_lote(cur, PENDENCIA_LOTE)
+                conn.commit()
+                if not lote:
+                    aguardar_notificacao(conn, PENDENCIA_ESPERA)
+                    continue
+                processar_lote(conn, lote, conhecidas)
+                falhas = 0
+            except ERROS_CONEXAO as e:
+                falhas += 1
+                espera = min(60, 2 ** falhas)
+                print(f"Conexão com o banco perdida ({e}); reconectando em {espera}s.")
+                conn = fechar(conn)
+                time.sleep(espera)
+            except Exception as e:
+                print(f"Erro ao processar lote de pendências: {e}")
+                if conn is not None and not conn.closed:
+                    try:
+                        conn.rollback()
+                        if lote:
+                            with conn.cursor() as cur:
+                                devolver(cur, [item[0] for item in lote], str(e))
+                            conn.commit()
+                    except Exception:
+                        conn = fechar(conn)
+                time.sleep(PENDENCIA_ESPERA)
+    finally:
+        fechar(conn)
+
+
+if __name__ == "__main__":
+    try:
+        executar()
+    except KeyboardInterrupt:
+        print("Worker de pendências encerrado.")